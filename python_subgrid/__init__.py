@@ -1,3 +1,14 @@
-import pkg_resources
-
-__version__ = pkg_resources.get_distribution("python-subgrid").version
+try:
+    # python 3.8+, pkg_resources is slow to import
+    from importlib.metadata import version, PackageNotFoundError
+except ImportError:
+    from pkg_resources import get_distribution, DistributionNotFound
+    try:
+        __version__ = get_distribution("python-subgrid").version
+    except DistributionNotFound:
+        __version__ = 'unknown'
+else:
+    try:
+        __version__ = version("python-subgrid")
+    except PackageNotFoundError:
+        __version__ = 'unknown'
@@ -0,0 +1,105 @@
+"""
+asyncio facade for the subgrid wrapper (python 3.7 and later).
+
+The model runs on one dedicated thread, the event loop only awaits it.
+ctypes releases the GIL while the Fortran library is running, so the loop
+keeps serving requests during an ``update``::
+
+    async def serve(subgrid):
+        model = AsyncSubgrid(subgrid)
+        async for t1, values in model.timesteps(outputs=['s1']):
+            publish(t1, values['s1'])
+
+All calls are executed one after the other on the model thread, so readers
+never see a variable halfway an update. Arrays are copied on the model
+thread before they are handed to the loop.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSubgrid(object):
+    """Run the calls on subgrid on a dedicated thread"""
+
+    def __init__(self, subgrid):
+        self.subgrid = subgrid
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs))
+
+    async def start(self):
+        await self._run(self.subgrid.start)
+
+    async def stop(self):
+        await self._run(self.subgrid.stop)
+
+    async def update(self, dt=-1):
+        """Advance the model, return the exit code of update"""
+        return await self._run(self.subgrid.update, dt)
+
+    async def get_nd(self, name, sliced=False):
+        """Return a copy of variable name"""
+        return await self._run(self._copy, name, sliced)
+
+    async def get_many(self, names, sliced=False):
+        """Return copies of the variables in names, all of the same step"""
+        return await self._run(self._copy_many, list(names), sliced)
+
+    async def call(self, name, *args, **kwargs):
+        """Call method or fortran function name, for example to change the
+        model with ``set_structure_field`` or ``discharge``"""
+        return await self._run(getattr(self.subgrid, name), *args, **kwargs)
+
+    def _copy(self, name, sliced):
+        array = self.subgrid.get_nd(name, sliced=sliced)
+        return None if array is None else array.copy()
+
+    def _copy_many(self, names, sliced):
+        arrays = self.subgrid.get_many(names, sliced=sliced)
+        return {name: array.copy() for name, array in arrays.items()}
+
+    def _step(self, dt, outputs):
+        self.subgrid.update(dt)
+        t1 = float(self.subgrid.get_nd('t1'))
+        values = self._copy_many(outputs, True) if outputs else {}
+        return t1, values
+
+    def timesteps(self, t_end=None, outputs=None, dt=-1):
+        """Return an async iterator that advances the model one step at a
+        time until ``t_end`` (default: tend) and yields t1 and copies of the
+        ``outputs`` after every step"""
+        return Timesteps(self, t_end, list(outputs or []), dt)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class Timesteps(object):
+    """Async iterator over the timesteps of an :class:`AsyncSubgrid`"""
+
+    def __init__(self, model, t_end, outputs, dt):
+        self.model = model
+        self.t_end = t_end
+        self.outputs = outputs
+        self.dt = dt
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        model = self.model
+        if self.t_end is None:
+            self.t_end = float(await model.get_nd('tend'))
+        t1 = float(await model.get_nd('t1'))
+        if t1 >= self.t_end:
+            raise StopAsyncIteration
+        return await model._run(model._step, self.dt, self.outputs)
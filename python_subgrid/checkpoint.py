@@ -0,0 +1,278 @@
+"""
+Incremental checkpoints of the model state on disk.
+
+The first checkpoint is a full copy of the state variables (see
+:meth:`~python_subgrid.wrapper.SubgridWrapper.snapshot`). Every next
+checkpoint only stores the blocks of ``block_size`` bytes that changed since
+the checkpoint it is based on::
+
+    manager = CheckpointManager(subgrid, 'checkpoints')
+    while t < t_end:
+        subgrid.run_until(t + 600)
+        manager.checkpoint()
+    manager.restore(3)
+
+Every checkpoint refers to its parent, so after restoring an older
+checkpoint, new checkpoints start a branch from it. Use :meth:`compact` to
+turn a checkpoint into a full copy and remove the deltas it no longer needs.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from python_subgrid.snapshots import Snapshot
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = 'index.json'
+BLOCK_SIZE = 64 * 1024
+
+
+def _name(variable):
+    """Return variable name as a native string"""
+    if not isinstance(variable, str):
+        variable = variable.decode('ascii')
+    return variable
+
+
+def _blocks(data, block_size):
+    """Return the start of every block of bytes"""
+    return range(0, len(data), block_size)
+
+
+class CheckpointManager(object):
+    """Write and restore incremental checkpoints of subgrid in directory"""
+
+    def __init__(self, subgrid, directory, block_size=BLOCK_SIZE,
+                 variables=None, compress=True):
+        self.subgrid = subgrid
+        self.directory = directory
+        self.block_size = block_size
+        self.variables = variables
+        self.compress = compress
+        # block hashes of the state of the parent, by variable
+        self.hashes = None
+        self.parent = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.index_path = os.path.join(directory, INDEX_FILENAME)
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+            if self.index['block_size'] != block_size:
+                raise ValueError(
+                    "Checkpoints in {} use blocks of {} bytes".format(
+                        directory, self.index['block_size']))
+        else:
+            self.index = {
+                'block_size': block_size,
+                'variables': {},
+                'checkpoints': []
+            }
+
+    @property
+    def checkpoints(self):
+        """Return the checkpoints by id"""
+        return {checkpoint['id']: checkpoint
+                for checkpoint in self.index['checkpoints']}
+
+    def _write_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+        os.rename(tmp_path, self.index_path)
+
+    def _hash(self, data):
+        """Return the hashes of the blocks in data"""
+        block_size = self.block_size
+        return [hashlib.sha1(data[start:start + block_size]).hexdigest()
+                for start in _blocks(data, block_size)]
+
+    def _state(self):
+        """Return the current state, as bytes by variable name"""
+        snapshot = self.subgrid.snapshot(variables=self.variables)
+        state = {}
+        for variable in snapshot:
+            array = snapshot[variable]
+            name = _name(variable)
+            self.index['variables'][name] = {
+                'dtype': array.dtype.str,
+                'shape': [int(x) for x in array.shape]
+            }
+            state[name] = array.tobytes(order='F')
+        return state
+
+    def _save(self, filename, blocks):
+        path = os.path.join(self.directory, filename)
+        if self.compress:
+            np.savez_compressed(path, **blocks)
+        else:
+            np.savez(path, **blocks)
+
+    def checkpoint(self):
+        """Write a checkpoint of the current state, return its id.
+
+        The first checkpoint (and the first after a change in the variables)
+        is a full copy, the rest only contain the changed blocks.
+        """
+        state = self._state()
+        hashes = {name: self._hash(data) for name, data in state.items()}
+        base = (self.hashes is None or
+                set(self.hashes) != set(hashes) or
+                any(len(self.hashes[name]) != len(hashes[name])
+                    for name in hashes))
+        checkpoints = self.index['checkpoints']
+        id_ = max([checkpoint['id'] for checkpoint in checkpoints] + [0]) + 1
+        filename = 'checkpoint-{:06d}.npz'.format(id_)
+        block_size = self.block_size
+        blocks = {}
+        n_changed = 0
+        for name, data in state.items():
+            n_blocks = len(hashes[name])
+            if base:
+                changed = range(n_blocks)
+            else:
+                changed = [i for i, (old, new)
+                           in enumerate(zip(self.hashes[name], hashes[name]))
+                           if old != new]
+            n_changed += len(changed)
+            blocks[name + '.blocks'] = np.array(changed, dtype='int64')
+            blocks[name + '.data'] = np.frombuffer(b''.join(
+                data[i * block_size:(i + 1) * block_size] for i in changed
+            ), dtype='uint8')
+        self._save(filename, blocks)
+        checkpoints.append({
+            'id': id_,
+            'parent': None if base else self.parent,
+            'file': filename,
+            't1': float(self.subgrid.get_nd('t1')),
+            'blocks': n_changed
+        })
+        self._write_index()
+        logger.info("Wrote %s checkpoint %s with %s blocks",
+                    'base' if base else 'delta', id_, n_changed)
+        self.hashes = hashes
+        self.parent = id_
+        return id_
+
+    def chain(self, id_):
+        """Return the ids needed to restore id_, newest first"""
+        checkpoints = self.checkpoints
+        chain = []
+        while id_ is not None:
+            chain.append(id_)
+            id_ = checkpoints[id_]['parent']
+        return chain
+
+    def load(self, id_=None):
+        """Return the state of checkpoint id_ (default: the latest) as a
+        dictionary of arrays"""
+        if id_ is None:
+            id_ = self.index['checkpoints'][-1]['id']
+        checkpoints = self.checkpoints
+        block_size = self.block_size
+        variables = self.index['variables']
+        buffers = {}
+        missing = {}
+        for name, variable in variables.items():
+            dtype = np.dtype(str(variable['dtype']))
+            nbytes = int(np.prod(variable['shape'])) * dtype.itemsize
+            buffers[name] = np.empty(nbytes, dtype='uint8')
+            missing[name] = np.ones(
+                len(_blocks(buffers[name], block_size)), dtype='bool')
+        # walk from the checkpoint to its base, the newest block wins
+        for chain_id in self.chain(id_):
+            path = os.path.join(self.directory,
+                                checkpoints[chain_id]['file'])
+            with np.load(path) as blocks:
+                for name, buffer in buffers.items():
+                    if not missing[name].any():
+                        continue
+                    indices = blocks[name + '.blocks']
+                    data = blocks[name + '.data']
+                    offset = 0
+                    for i in indices:
+                        start = i * block_size
+                        size = min(block_size, len(buffer) - start)
+                        if missing[name][i]:
+                            buffer[start:start + size] = \
+                                data[offset:offset + size]
+                            missing[name][i] = False
+                        offset += size
+        state = {}
+        for name, buffer in buffers.items():
+            if missing[name].any():
+                raise ValueError(
+                    "Checkpoint {} is incomplete for {}".format(id_, name))
+            variable = variables[name]
+            state[name] = np.frombuffer(
+                buffer.tobytes(), dtype=np.dtype(str(variable['dtype']))
+            ).reshape(variable['shape'], order='F')
+        return state
+
+    def restore(self, id_=None):
+        """Restore the model to checkpoint id_ (default: the latest).
+
+        New checkpoints are based on the restored one.
+        """
+        if id_ is None:
+            id_ = self.index['checkpoints'][-1]['id']
+        state = self.load(id_)
+        self.subgrid.restore(Snapshot(state.items()))
+        self.hashes = {name: self._hash(array.tobytes(order='F'))
+                       for name, array in state.items()}
+        self.parent = id_
+        logger.info("Restored checkpoint %s", id_)
+
+    def compact(self, id_=None):
+        """Turn checkpoint id_ (default: the latest) into a full copy.
+
+        Older checkpoints in its chain are removed, unless another
+        checkpoint still needs them.
+        """
+        if id_ is None:
+            id_ = self.index['checkpoints'][-1]['id']
+        checkpoint = self.checkpoints[id_]
+        if checkpoint['parent'] is None:
+            # already a full copy
+            return []
+        older = self.chain(id_)[1:]
+        state = self.load(id_)
+        blocks = {}
+        for name, array in state.items():
+            data = array.tobytes(order='F')
+            blocks[name + '.blocks'] = np.arange(
+                len(_blocks(data, self.block_size)), dtype='int64')
+            blocks[name + '.data'] = np.frombuffer(data, dtype='uint8')
+        filename = 'checkpoint-{:06d}-base.npz'.format(id_)
+        self._save(filename, blocks)
+        old_filename = checkpoint['file']
+        checkpoint.update(parent=None, file=filename,
+                          blocks=sum(len(blocks[name + '.blocks'])
+                                     for name in state))
+        # keep what the remaining checkpoints need
+        needed = set()
+        for other in self.index['checkpoints']:
+            if other['id'] not in older:
+                needed.update(self.chain(other['id']))
+        removed = [self.checkpoints[old] for old in older
+                   if old not in needed]
+        self.index['checkpoints'] = [
+            other for other in self.index['checkpoints']
+            if other['id'] in needed
+        ]
+        self._write_index()
+        if self.parent not in needed:
+            # the next checkpoint is a full copy
+            self.hashes = None
+            self.parent = None
+        for other in removed + [{'file': old_filename}]:
+            os.remove(os.path.join(self.directory, other['file']))
+        logger.info("Compacted checkpoint %s, removed %s checkpoints",
+                    id_, len(removed))
+        return [other['id'] for other in removed]
@@ -0,0 +1,221 @@
+"""
+Run an ensemble of scenarios from one initialized model.
+
+Loading and initializing a large model takes most of the time of a short
+run. The :class:`EnsembleRunner` forks a worker process for every member
+from a model that is started and initialized once. The workers share the
+memory of the parent until they write to it (copy-on-write), apply their own
+scenario and run to the end time. Selected outputs are streamed back::
+
+    with SubgridWrapper(mdu=mdu) as subgrid:
+        subgrid.initmodel()
+        runner = EnsembleRunner(subgrid, outputs=['s1'], interval=300,
+                                output_dir='ensemble')
+        results = runner.run({'bui10': scenario10, 'bui8': scenario8})
+
+This needs ``fork``, so it does not work on Windows.
+"""
+
+import logging
+import multiprocessing
+import os
+import random
+import traceback
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+from python_subgrid.raingrid import RainGridContainer
+from python_subgrid.tools.scenario import apply_events, clean_events
+
+
+logger = logging.getLogger(__name__)
+
+try:
+    fork_context = multiprocessing.get_context('fork')
+except AttributeError:
+    # python 2 always forks on unix
+    fork_context = multiprocessing
+except ValueError:
+    fork_context = None
+
+
+def run_member(subgrid, name, scenario, queue, outputs, interval, t_end,
+               output_dir, rain_grid_container=None, rain_interval=None):
+    """Run scenario in a forked process, report to queue.
+
+    The rain grid container (and its rain weights) is built by the parent,
+    the member gets a copy. Events are applied every ``rain_interval``
+    seconds of model time, at the first callback after they're due.
+    """
+    try:
+        subgrid._after_fork()
+        # don't use the same 'random' memcdf names as the other members
+        random.seed()
+        if output_dir:
+            subgrid.set_output_directory(output_dir)
+        if not scenario.events():
+            rain_grid_container = None
+
+        def send_outputs(subgrid):
+            t1 = float(subgrid.get_nd('t1'))
+            values = subgrid.get_many(outputs, copy=True)
+            # copy, the buffer is reused
+            queue.put((name, 'output', (t1, {key: value.copy() for
+                                             key, value in values.items()})))
+
+        def step(subgrid):
+            # the events of every rain interval that is due, events that
+            # start in it are started, those that end in the previous
+            # interval are finished
+            while (rain_grid_container is not None and
+                   next_rain[0] <= subgrid.get_nd('t1')):
+                apply_events(subgrid, scenario, rain_grid_container,
+                             sim_time=next_rain[0], window=rain_interval)
+                next_rain[0] += rain_interval
+
+        def callback(subgrid):
+            step(subgrid)
+            if outputs and interval and next_time[0] <= subgrid.get_nd('t1'):
+                send_outputs(subgrid)
+                next_time[0] += interval
+
+        # only call back when there's something to do
+        intervals = []
+        if rain_grid_container is not None:
+            intervals.append(rain_interval)
+        if outputs and interval:
+            intervals.append(interval)
+        t1 = float(subgrid.get_nd('t1'))
+        next_time = [t1 + (interval or 0)]
+        next_rain = [t1]
+        step(subgrid)
+        if intervals:
+            stats = subgrid.run_until(t_end, callback=callback,
+                                      interval=min(intervals))
+        else:
+            stats = subgrid.run_until(t_end)
+        if outputs:
+            send_outputs(subgrid)
+        if rain_grid_container is not None:
+            clean_events(scenario, rain_grid_container)
+        queue.put((name, 'done', stats))
+    except Exception:
+        queue.put((name, 'error', traceback.format_exc()))
+
+
+class EnsembleRunner(object):
+    """Fork a process for every scenario from an initialized subgrid"""
+
+    def __init__(self, subgrid, outputs=None, interval=None, t_end=None,
+                 processes=None, output_dir=None, rain_interval=300,
+                 cache_dir=None):
+        """Initialize the runner.
+
+        ``outputs`` are the variables that are sent back every ``interval``
+        seconds of model time (and at the end). The members run until
+        ``t_end`` (default: the model's ``tend``), ``processes`` (default:
+        the number of cores) at the same time. Every member writes its output
+        in its own directory in ``output_dir``.
+
+        The scenario events are applied every ``rain_interval`` seconds of
+        model time (the radar has a frame every 5 minutes). The rain weights
+        are computed once for all members, or read from ``cache_dir``.
+        """
+        if fork_context is None:
+            raise RuntimeError("Ensembles need fork")
+        self.subgrid = subgrid
+        self.outputs = list(outputs or [])
+        self.interval = interval
+        self.t_end = t_end
+        self.processes = processes or multiprocessing.cpu_count()
+        self.output_dir = output_dir
+        self.rain_interval = rain_interval
+        self.cache_dir = cache_dir
+
+    def _member_dir(self, name):
+        if not self.output_dir:
+            return None
+        directory = os.path.abspath(os.path.join(self.output_dir, name))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        return directory
+
+    def run(self, scenarios, callback=None):
+        """Run every scenario (a dictionary of name: EventContainer).
+
+        The outputs are passed to ``callback(name, t1, values)`` as they
+        come in. Without a callback they are collected in the results.
+
+        Return a dictionary with, by name, the ``outputs`` (a list of t1,
+        values), the run statistics (see ``run_until``) and the ``error``
+        (a traceback) if the member failed.
+        """
+        queue = fork_context.Queue()
+        pending = list(scenarios.items())
+        running = {}
+        # members that exited, their last messages can still be in the queue
+        exited = set()
+        results = {name: {'outputs': [], 'stats': None, 'error': None}
+                   for name in scenarios}
+        t_end = self.t_end
+        if t_end is None:
+            t_end = float(self.subgrid.get_nd('tend'))
+        rain_grid_container = None
+        if any(scenario.events() for scenario in scenarios.values()):
+            # rain is written in the model directly, no netCDF file
+            rain_grid_container = RainGridContainer(
+                self.subgrid, memcdf_name=None, forcing=True,
+                cache_dir=self.cache_dir)
+        while pending or running:
+            while pending and len(running) < self.processes:
+                name, scenario = pending.pop(0)
+                process = fork_context.Process(
+                    target=run_member,
+                    name='subgrid-{}'.format(name),
+                    args=(self.subgrid, name, scenario, queue, self.outputs,
+                          self.interval, t_end, self._member_dir(name),
+                          rain_grid_container, self.rain_interval))
+                process.start()
+                logger.info("Started member %s (pid %s)", name, process.pid)
+                running[name] = process
+            try:
+                name, kind, value = queue.get(timeout=1)
+            except Empty:
+                # nothing in the queue, check for crashed members: a member
+                # that exited without reporting, after one more timeout
+                for name, process in list(running.items()):
+                    if process.is_alive():
+                        continue
+                    if process.exitcode == 0 and name not in exited:
+                        exited.add(name)
+                        continue
+                    process.join()
+                    results[name]['error'] = (
+                        "Member exited with code {}".format(process.exitcode))
+                    logger.error("Member %s exited with code %s",
+                                 name, process.exitcode)
+                    del running[name]
+                continue
+            if kind == 'output':
+                t1, values = value
+                if callback is None:
+                    results[name]['outputs'].append((t1, values))
+                else:
+                    callback(name, t1, values)
+                continue
+            process = running.pop(name, None)
+            if process is None:
+                # already declared crashed
+                logger.warning("Ignoring %r of finished member %s",
+                               kind, name)
+                continue
+            if kind == 'done':
+                results[name]['stats'] = value
+                logger.info("Member %s done, %s steps", name, value['steps'])
+            else:
+                results[name]['error'] = value
+                logger.error("Member %s failed:\n%s", name, value)
+            process.join()
+        return results
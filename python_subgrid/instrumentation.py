@@ -0,0 +1,140 @@
+"""
+Call counts and latencies of the wrapped Fortran functions.
+
+Instrumentation is off by default and costs nothing then. Switch it on with
+``SubgridWrapper(instrument=True)`` or
+:meth:`~python_subgrid.wrapper.SubgridWrapper.enable_instrumentation`::
+
+    instrumentation = subgrid.enable_instrumentation()
+    subgrid.run_until(3600)
+    print(instrumentation.to_prometheus())
+
+Every function in ``FUNCTIONS`` and the ``get_nd``, ``set_structure_field``
+and ``update_tables`` methods are timed, including the conversion of the
+arguments.
+"""
+
+import collections
+import functools
+import json
+import timeit
+
+import numpy as np
+
+
+# methods of the wrapper that are timed on top of the fortran functions
+INSTRUMENTED_METHODS = ['get_nd', 'set_structure_field', 'update_tables']
+QUANTILES = [0.5, 0.9, 0.99]
+
+
+class CallStats(object):
+    """Counts and latencies of one function.
+
+    The percentiles are computed over the last ``max_samples`` calls.
+    """
+
+    def __init__(self, max_samples=1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = collections.deque(maxlen=max_samples)
+
+    def record(self, duration):
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        self.samples.append(duration)
+
+    def percentiles(self, quantiles=QUANTILES):
+        """Return the latency for every quantile (0 - 1)"""
+        if not self.samples:
+            return [0.0 for quantile in quantiles]
+        values = np.percentile(list(self.samples),
+                               [100 * quantile for quantile in quantiles])
+        return [float(value) for value in values]
+
+    def summary(self):
+        result = {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max
+        }
+        for quantile, value in zip(QUANTILES, self.percentiles()):
+            result['p{:g}'.format(100 * quantile)] = value
+        return result
+
+
+class Instrumentation(object):
+    """Record call counts and latencies, by function name"""
+
+    def __init__(self, max_samples=1000):
+        self.max_samples = max_samples
+        self.stats = {}
+        self.timer = timeit.default_timer
+
+    def __getitem__(self, name):
+        try:
+            return self.stats[name]
+        except KeyError:
+            stats = self.stats[name] = CallStats(self.max_samples)
+            return stats
+
+    def wrap(self, name, func):
+        """Return func, timed under name"""
+        stats = self[name]
+        timer = self.timer
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.record(timer() - start)
+        # keep the ctypes annotations of the wrapped fortran functions
+        for attribute in ('argtypes', 'restype'):
+            if hasattr(func, attribute):
+                setattr(timed, attribute, getattr(func, attribute))
+        timed.instrumented = func
+        return timed
+
+    def reset(self):
+        self.stats.clear()
+
+    def summary(self):
+        """Return a dictionary with the statistics, by function name"""
+        return {name: stats.summary()
+                for name, stats in self.stats.items()
+                if stats.count}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.summary(), sort_keys=True, **kwargs)
+
+    def to_prometheus(self, prefix='subgrid'):
+        """Return the statistics in the prometheus text format"""
+        lines = [
+            '# HELP {}_calls_total Number of calls.'.format(prefix),
+            '# TYPE {}_calls_total counter'.format(prefix),
+        ]
+        names = sorted(name for name, stats in self.stats.items()
+                       if stats.count)
+        for name in names:
+            lines.append('{}_calls_total{{function="{}"}} {}'.format(
+                prefix, name, self.stats[name].count))
+        lines.extend([
+            '# HELP {}_call_seconds Latency of calls.'.format(prefix),
+            '# TYPE {}_call_seconds summary'.format(prefix),
+        ])
+        for name in names:
+            stats = self.stats[name]
+            for quantile, value in zip(QUANTILES, stats.percentiles()):
+                lines.append(
+                    '{}_call_seconds{{function="{}",quantile="{:g}"}} '
+                    '{!r}'.format(prefix, name, quantile, value))
+            lines.append('{}_call_seconds_sum{{function="{}"}} {!r}'.format(
+                prefix, name, stats.total))
+            lines.append('{}_call_seconds_count{{function="{}"}} {}'.format(
+                prefix, name, stats.count))
+        return '\n'.join(lines) + '\n'
@@ -10,10 +10,7 @@ import pandas
 import scipy.interpolate
 # enum34
 import enum
-# mayavi
-from tvtk.api import tvtk, write_data
-# for spatial matching
-import rtree
+# mayavi (tvtk) and rtree are slow to import, they are imported when needed
 
 # Use a logger named to the module
 logger = logging.getLogger(__name__)
@@ -44,11 +41,13 @@ class ParticleSystem(object):
 
     def make_particles(self):
         """just an empty polydata, with an empty set of indices"""
+        from tvtk.api import tvtk
         pd = tvtk.PolyData()
         return pd
 
     def make_tracer(self):
         """create a data object to store particles"""
+        from tvtk.api import tvtk
         grid = self.grid
         # This drops unlinked polygons
         # Clean the polydata
@@ -104,6 +103,7 @@ class ParticleSystem(object):
     def make_grid(self):
         """return an unstructured grid, based on contours (xc, yc) with possible
         scalar and vector values"""
+        from tvtk.api import tvtk
 
         # Get the contours
         xc = self.ds.variables['FlowElemContour_x']
@@ -208,6 +208,7 @@ class ParticleSystem(object):
         grid.modified()
 
     def save_grid(self):
+        from tvtk.api import write_data
         write_data(self.grid, 'grid.vtk')
 
     def get_points(self):
@@ -347,6 +348,7 @@ class ParticleSystem(object):
         assert len(self.source_ids) == self.particles.number_of_points, msg
 
         # ids of the source points
+        import rtree
         tree = rtree.Rtree()
         for i, (x_i, y_i, _) in zip(self.source_ids,
                                     self.particles.points.to_array()):
@@ -153,11 +153,7 @@ if __name__ == '__main__':
 
         # Start a reply process in the background, with variables available
         # after initialization, sent all at once as py_obj
-        data = {
-            var: subgrid.get_nd(var, sliced=True)
-            for var
-            in arguments.globalvariables
-        }
+        data = subgrid.get_many(arguments.globalvariables, sliced=True)
         # add the quad_grid for easy plotting
         data["quad_grid"] = python_subgrid.plotting.make_quad_grid(subgrid)
         process_incoming(subgrid, poller, rep, pull, data)
@@ -177,8 +173,9 @@ if __name__ == '__main__':
             if (i % arguments.interval):
                 continue
 
+            values = subgrid.get_many(arguments.outputvariables, sliced=True)
             for key in arguments.outputvariables:
-                value = subgrid.get_nd(key, sliced=True)
+                value = values[key]
                 metadata = {'name': key, 'iteration': i}
                 # 4ms for 1M doubles
                 logger.info("sending {}".format(metadata))
@@ -5,11 +5,6 @@ from shapely.geometry import shape
 import numpy as np
 import skimage.draw
 
-logging.basicConfig()
-logging.root.setLevel(logging.DEBUG)
-# ^^^ What is this doing at the top level? Everything that imports this gets
-# that setting. TODO
-
 
 def make_quad_grid(subgrid):
     """
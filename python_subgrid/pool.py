@@ -0,0 +1,277 @@
+"""
+A pool of worker processes that each run one model.
+
+The Fortran library keeps its state in global variables, so a process can
+run only one model at a time. A :class:`SubgridPool` manages worker
+processes that each own a :class:`~python_subgrid.wrapper.SubgridWrapper`.
+All calls return futures::
+
+    with SubgridPool(processes=4, max_loads=10) as pool:
+        model = pool.load(mdu).result()
+        model.call('initmodel').result()
+        model.update(-1).result()
+        s1 = model.get_nd('s1', sliced=True).result()
+        model.release()
+
+Workers load the library as soon as they start. Released workers stay alive
+and load the next model, the library is already loaded. Workers that loaded
+``max_loads`` models are replaced by a fresh process, to contain memory the
+library leaks between models.
+
+Workers are spawned, so they don't inherit the library of the parent. This
+needs python 3.
+"""
+
+import collections
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import traceback
+
+from concurrent.futures import Future
+
+from python_subgrid.wrapper import SubgridWrapper, preload_library
+
+
+logger = logging.getLogger(__name__)
+
+try:
+    # don't inherit a loaded library from the parent
+    worker_context = multiprocessing.get_context('spawn')
+except AttributeError:
+    # python 2 can only fork
+    worker_context = None
+
+
+class WorkerError(Exception):
+    """A call failed in a worker, the message has the traceback"""
+
+
+def worker_main(connection):
+    """Run commands from connection on the subgrid of this process"""
+    try:
+        # map the library while we wait for the first model
+        preload_library()
+    except Exception:
+        logger.exception("Could not preload the library")
+    subgrid = None
+    while True:
+        try:
+            request_id, command, args, kwargs = connection.recv()
+        except EOFError:
+            break
+        try:
+            result = None
+            if command == 'load':
+                if subgrid is not None:
+                    subgrid.stop()
+                subgrid = SubgridWrapper(*args, **kwargs)
+                subgrid.start()
+            elif command == 'unload':
+                if subgrid is not None:
+                    subgrid.stop()
+                subgrid = None
+            elif command == 'quit':
+                if subgrid is not None:
+                    subgrid.stop()
+                connection.send((request_id, True, None))
+                break
+            else:
+                if subgrid is None:
+                    raise RuntimeError("No model loaded")
+                result = getattr(subgrid, command)(*args, **kwargs)
+            connection.send((request_id, True, result))
+        except Exception:
+            connection.send((request_id, False, traceback.format_exc()))
+    connection.close()
+
+
+class Worker(object):
+    """A worker process and the futures of its pending calls"""
+
+    def __init__(self):
+        self.connection, child_connection = worker_context.Pipe()
+        self.process = worker_context.Process(
+            target=worker_main, args=(child_connection, ),
+            name='subgrid-worker')
+        self.process.daemon = True
+        self.process.start()
+        child_connection.close()
+        self.loads = 0
+        self.mdu = None
+        self.futures = {}
+        self.request_ids = itertools.count()
+        self.lock = threading.Lock()
+        self.reader = threading.Thread(target=self._read,
+                                       name='subgrid-worker-reader')
+        self.reader.daemon = True
+        self.reader.start()
+
+    def _read(self):
+        """Resolve futures with the results of the worker"""
+        while True:
+            try:
+                request_id, ok, result = self.connection.recv()
+            except (EOFError, IOError, OSError):
+                break
+            with self.lock:
+                future = self.futures.pop(request_id)
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(WorkerError(result))
+        # the worker is gone, fail what's left
+        with self.lock:
+            futures, self.futures = self.futures, {}
+        for future in futures.values():
+            future.set_exception(WorkerError("Worker stopped"))
+
+    def submit(self, command, *args, **kwargs):
+        """Send command to the worker, return a future of the result"""
+        future = Future()
+        with self.lock:
+            request_id = next(self.request_ids)
+            self.futures[request_id] = future
+            self.connection.send((request_id, command, args, kwargs))
+        return future
+
+    def stop(self, timeout=60):
+        # don't wait for the future, we may be in the reader thread
+        if self.process.is_alive():
+            self.submit('quit')
+            self.process.join(timeout)
+        if self.process.is_alive():
+            logger.error("Worker did not quit, terminating it")
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+class PooledModel(object):
+    """A model loaded in a worker of the pool, all calls return futures"""
+
+    def __init__(self, pool, worker):
+        self.pool = pool
+        self.worker = worker
+
+    def call(self, name, *args, **kwargs):
+        """Call method or fortran function name of the wrapper"""
+        if self.worker is None:
+            raise RuntimeError("Model is released")
+        return self.worker.submit(name, *args, **kwargs)
+
+    def update(self, dt=-1):
+        return self.call('update', dt)
+
+    def get_nd(self, name, sliced=False):
+        return self.call('get_nd', name, sliced=sliced)
+
+    def set_structure_field(self, name, id, field, value):
+        return self.call('set_structure_field', name, id, field, value)
+
+    def update_tables(self, name, nodelist):
+        return self.call('update_tables', name, list(nodelist))
+
+    def release(self):
+        """Give the worker back to the pool"""
+        worker, self.worker = self.worker, None
+        if worker is not None:
+            self.pool._release(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, tb):
+        self.release()
+
+
+class SubgridPool(object):
+    """Up to ``processes`` workers (default: the number of cores), that are
+    replaced after ``max_loads`` models"""
+
+    def __init__(self, processes=None, max_loads=10):
+        if worker_context is None:
+            raise RuntimeError("Pools need the spawn start method")
+        self.processes = processes or multiprocessing.cpu_count()
+        self.max_loads = max_loads
+        self.idle = []
+        self.busy = set()
+        # loads waiting for a worker
+        self.waiting = collections.deque()
+        self.lock = threading.Lock()
+
+    def load(self, mdu, **kwargs):
+        """Load the model in a worker, return a future of a
+        :class:`PooledModel`. The keyword arguments are passed to the
+        :class:`~python_subgrid.wrapper.SubgridWrapper`."""
+        future = Future()
+        # the worker changes its directory to that of the previous model
+        mdu = os.path.abspath(mdu)
+        with self.lock:
+            worker = self._worker(mdu)
+            if worker is None:
+                self.waiting.append((future, mdu, kwargs))
+                return future
+        self._load(worker, future, mdu, kwargs)
+        return future
+
+    def _worker(self, mdu):
+        """Return a free worker (call with the lock), None if all are
+        busy"""
+        if self.idle:
+            # prefer a worker that ran the same model before
+            matching = [worker for worker in self.idle if worker.mdu == mdu]
+            worker = (matching or self.idle)[0]
+            self.idle.remove(worker)
+        elif len(self.busy) < self.processes:
+            worker = Worker()
+        else:
+            return None
+        self.busy.add(worker)
+        return worker
+
+    def _load(self, worker, future, mdu, kwargs):
+        worker.loads += 1
+        worker.mdu = mdu
+
+        def loaded(load_future):
+            error = load_future.exception()
+            if error is not None:
+                self._release(worker)
+                future.set_exception(error)
+            else:
+                future.set_result(PooledModel(self, worker))
+        worker.submit('load', mdu=mdu, **kwargs).add_done_callback(loaded)
+
+    def _release(self, worker):
+        recycle = (worker.loads >= self.max_loads or
+                   not worker.process.is_alive())
+        if recycle:
+            logger.info("Recycling worker after %s models", worker.loads)
+            worker.stop()
+        with self.lock:
+            self.busy.discard(worker)
+            if not recycle:
+                self.idle.append(worker)
+            if not self.waiting:
+                return
+            future, mdu, kwargs = self.waiting.popleft()
+            worker = self._worker(mdu)
+        self._load(worker, future, mdu, kwargs)
+
+    def shutdown(self):
+        """Stop all workers"""
+        with self.lock:
+            workers = self.idle + list(self.busy)
+            self.idle = []
+            self.busy = set()
+        for worker in workers:
+            worker.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, tb):
+        self.shutdown()
@@ -0,0 +1,378 @@
+"""
+Sources of radar frames and a cache for them.
+
+A :class:`RainGrid <python_subgrid.raingrid.RainGrid>` reads its frames from
+a :class:`RainSource`. The :class:`RasterServerSource` (the default)
+downloads them from the raster server, the :class:`ArchiveSource` reads them
+from local monthly radar archives, so historic storms can be replayed
+without network access::
+
+    source = ArchiveSource('/data/radar/{year}/RAD_TF0005_A_{year}{month}.h5')
+    rain_grid = RainGrid(subgrid, source=source)
+
+Downloading a radar frame takes a lot longer than a timestep. The
+:class:`RadarFrameCache` keeps frames in memory (the least recently used are
+dropped) and, with a ``directory``, on disk, so a rerun of the same storm
+doesn't download anything. With ``prefetch`` the next frames are downloaded
+in the background while the model runs::
+
+    cache = RadarFrameCache(directory='radar-cache', prefetch=3)
+    rain_grid = RainGrid(subgrid, source=RasterServerSource(cache=cache))
+
+Frames are keyed by everything that is passed to the fetch function (the
+bounding box, size, time, layer and server), the files on disk are named by
+the sha1 of that key.
+"""
+
+import abc
+import collections
+import datetime
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+FRAME_INTERVAL = datetime.timedelta(minutes=5)
+
+
+class RadarFrameCache(object):
+    """Frames by key in memory (at most ``max_frames``) and in directory.
+
+    ``fetch(bbox, width, height, datetime, **kwargs)`` returns the frame
+    that is not in the cache (default: :func:`raingrid.get_rain`). After
+    every :meth:`get` the ``prefetch`` frames after it are fetched by
+    ``workers`` background threads.
+
+    Frames are returned read-only, they are shared by all users of the
+    cache.
+    """
+
+    def __init__(self, directory=None, max_frames=32, prefetch=0,
+                 workers=2, fetch=None):
+        self.directory = directory
+        self.max_frames = max_frames
+        self.prefetch = prefetch
+        if fetch is None:
+            from python_subgrid.raingrid import get_rain as fetch
+        self.fetch = fetch
+        self.frames = collections.OrderedDict()
+        # futures of the frames that are being fetched, by key
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.executor = None
+        if prefetch:
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.hits = 0
+        self.misses = 0
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def key(bbox, width, height, datetime, **kwargs):
+        """Return the key of a frame, a sha1 hex digest"""
+        parts = [tuple(float(x) for x in bbox), int(width), int(height),
+                 datetime.isoformat()]
+        parts.extend(sorted(kwargs.items()))
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.npy')
+
+    def _remember(self, key, frame):
+        """Keep frame in memory (call with the lock)"""
+        self.frames.pop(key, None)
+        self.frames[key] = frame
+        while len(self.frames) > self.max_frames:
+            self.frames.popitem(last=False)
+
+    def _lookup(self, key):
+        """Return the frame from memory or disk, None if it's not there"""
+        with self.lock:
+            frame = self.frames.pop(key, None)
+            if frame is not None:
+                # most recently used
+                self.frames[key] = frame
+                return frame
+        if self.directory:
+            path = self._path(key)
+            if os.path.exists(path):
+                frame = np.load(path)
+                frame.flags.writeable = False
+                with self.lock:
+                    self._remember(key, frame)
+                return frame
+        return None
+
+    def _store(self, key, frame):
+        """Keep frame in memory and write it to disk"""
+        frame = np.array(frame)
+        frame.flags.writeable = False
+        with self.lock:
+            self._remember(key, frame)
+        if self.directory:
+            path = self._path(key)
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    # another thread made it
+                    pass
+            # write and rename, readers never see half a frame
+            fileno, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fileno, 'wb') as f:
+                np.save(f, frame)
+            os.rename(tmp_path, path)
+        return frame
+
+    def _load(self, key, bbox, width, height, datetime, kwargs):
+        """Return the frame from the cache, fetch it if it's not there"""
+        frame = self._lookup(key)
+        if frame is not None:
+            return frame
+        logger.debug('Fetching radar frame at %s', datetime)
+        frame = self.fetch(bbox, width, height, datetime, **kwargs)
+        return self._store(key, frame)
+
+    def _submit(self, key, bbox, width, height, datetime, kwargs):
+        """Fetch a frame in the background, unless it's already there"""
+        with self.lock:
+            if key in self.frames or key in self.pending:
+                return
+            future = self.executor.submit(self._load, key, bbox, width,
+                                          height, datetime, kwargs)
+            self.pending[key] = future
+
+        def done(future):
+            with self.lock:
+                self.pending.pop(key, None)
+            if future.exception() is not None:
+                logger.warning('Prefetching radar frame at %s failed: %s',
+                               datetime, future.exception())
+        future.add_done_callback(done)
+
+    def get(self, bbox, width, height, datetime, **kwargs):
+        """Return the frame, from the cache if possible"""
+        key = self.key(bbox, width, height, datetime, **kwargs)
+        with self.lock:
+            future = self.pending.get(key)
+        if future is not None and future.exception() is None:
+            # being prefetched, wait for it
+            frame = future.result()
+            self.hits += 1
+        else:
+            frame = self._lookup(key)
+            if frame is None:
+                self.misses += 1
+                frame = self._load(key, bbox, width, height, datetime, kwargs)
+            else:
+                self.hits += 1
+        for i in range(1, self.prefetch + 1):
+            next_datetime = datetime + i * FRAME_INTERVAL
+            self._submit(self.key(bbox, width, height, next_datetime,
+                                  **kwargs),
+                         bbox, width, height, next_datetime, kwargs)
+        return frame
+
+    def clear(self):
+        """Forget the frames in memory"""
+        with self.lock:
+            self.frames.clear()
+
+    def close(self):
+        """Stop prefetching"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            self.prefetch = 0
+
+
+class RainSource(abc.ABCMeta(str('ABC'), (object, ), {})):
+    """Interface of the sources of radar frames.
+
+    :meth:`get` returns the rain in mm per 5 minutes as an array of
+    ``height`` rows (the northern row first) and ``width`` columns that
+    covers ``bbox`` (x1, x2, y1, y2).
+    """
+
+    @abc.abstractmethod
+    def get(self, bbox, width, height, datetime):
+        """Return the frame of datetime"""
+
+    def close(self):
+        pass
+
+
+class RasterServerSource(RainSource):
+    """Frames from the raster server, through ``cache`` (a
+    :class:`RadarFrameCache`) if given"""
+
+    def __init__(self, layer='radar:5min', server='https://raster.lizard.net',
+                 srs='epsg:28992', cache=None):
+        self.layer = layer
+        self.server = server
+        self.srs = srs
+        self.cache = cache
+
+    def get(self, bbox, width, height, datetime):
+        if self.cache is not None:
+            fetch = self.cache.get
+        else:
+            from python_subgrid.raingrid import get_rain as fetch
+        return fetch(bbox, width, height, datetime, srs=self.srs,
+                     layer=self.layer, server=self.server)
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+
+
+class ArchiveFile(object):
+    """An open radar archive, with the index of its timestamps"""
+
+    def __init__(self, path, variable, time, x, y):
+        import netCDF4
+        self.path = path
+        # netCDF4 reads HDF5 files as well
+        self.dataset = netCDF4.Dataset(path)
+        self.variable = self.dataset.variables[variable]
+        # read the times and coordinates once
+        times = self.dataset.variables[time]
+        dates = netCDF4.num2date(times[:], times.units,
+                                 getattr(times, 'calendar', 'standard'))
+        self.index = {}
+        for i, date in enumerate(np.ravel(dates)):
+            self.index[datetime.datetime(date.year, date.month, date.day,
+                                         date.hour, date.minute)] = i
+        self.x = self.dataset.variables[x][:]
+        self.y = self.dataset.variables[y][:]
+        # the position of time, y and x in the dimensions of the variable
+        dimensions = self.variable.dimensions
+        self.axes = [dimensions.index(self.dataset.variables[name]
+                                      .dimensions[0])
+                     for name in (time, y, x)]
+        # pixels to read by bbox, width and height
+        self.windows = {}
+
+    def _pixels(self, coordinates, start, stop, n):
+        """Return the nearest pixels of n cells from start to stop, and
+        whether they are inside the archive"""
+        centres = start + (np.arange(n) + 0.5) * (stop - start) / n
+        step = coordinates[1] - coordinates[0]
+        pixels = np.round((centres - coordinates[0]) / step).astype(int)
+        inside = (pixels >= 0) & (pixels < len(coordinates))
+        return np.clip(pixels, 0, len(coordinates) - 1), inside
+
+    def _window(self, bbox, width, height):
+        """Return the slices of the pixels that cover bbox and the rows and
+        columns of the frame in them"""
+        key = (tuple(bbox), width, height)
+        if key not in self.windows:
+            x1, x2, y1, y2 = bbox
+            columns, columns_inside = self._pixels(
+                self.x, min(x1, x2), max(x1, x2), width)
+            # northern row first
+            rows, rows_inside = self._pixels(
+                self.y, max(y1, y2), min(y1, y2), height)
+            slices = (slice(rows.min(), rows.max() + 1),
+                      slice(columns.min(), columns.max() + 1))
+            inside = rows_inside[:, np.newaxis] & columns_inside
+            self.windows[key] = (slices, rows - rows.min(),
+                                 columns - columns.min(), inside)
+        return self.windows[key]
+
+    def frame(self, i, bbox, width, height):
+        """Return frame i resampled on bbox"""
+        (row_slice, column_slice), rows, columns, inside = self._window(
+            bbox, width, height)
+        index = [None] * 3
+        index[self.axes[0]] = i
+        index[self.axes[1]] = row_slice
+        index[self.axes[2]] = column_slice
+        # only the chunks of the window are read
+        window = np.ma.filled(self.variable[tuple(index)], 0.0)
+        if self.axes[2] < self.axes[1]:
+            window = window.T
+        frame = window[np.ix_(rows, columns)].astype('f8')
+        frame[~inside] = 0.0
+        return frame
+
+    def close(self):
+        self.dataset.close()
+
+
+class ArchiveSource(RainSource):
+    """Frames from local radar archives (netCDF or HDF5 files).
+
+    ``path_template`` is formatted with the ``year``, ``month`` and ``day``
+    of the frame (zero padded), for example
+    ``'/data/radar/RAD_TF0005_A_{year}{month}01000000.h5'`` for monthly
+    archives. ``variable`` has the rain along the ``time``, ``y`` and ``x``
+    coordinate variables (in any order), times in CF units. The rain is
+    multiplied with ``factor`` to get mm per 5 minutes.
+
+    The times of a file are read once, frames are found by timestamp and
+    only the pixels in the bounding box are read. Frames are resampled
+    (nearest pixel) to the requested size. The last ``max_files`` files
+    are kept open.
+    """
+
+    def __init__(self, path_template, variable='precipitation', time='time',
+                 x='x', y='y', factor=1.0, max_files=2):
+        self.path_template = path_template
+        self.variable = variable
+        self.time = time
+        self.x = x
+        self.y = y
+        self.factor = factor
+        self.max_files = max_files
+        self.files = collections.OrderedDict()
+        # netCDF4 is not thread safe
+        self.lock = threading.Lock()
+
+    def path(self, datetime):
+        """Return the path of the archive with the frame at datetime"""
+        return self.path_template.format(year='%04d' % datetime.year,
+                                         month='%02d' % datetime.month,
+                                         day='%02d' % datetime.day)
+
+    def _file(self, path):
+        """Return the open archive at path (call with the lock)"""
+        archive = self.files.pop(path, None)
+        if archive is None:
+            logger.info('Indexing radar archive %s', path)
+            archive = ArchiveFile(path, self.variable, self.time, self.x,
+                                  self.y)
+        self.files[path] = archive
+        while len(self.files) > self.max_files:
+            self.files.popitem(last=False)[1].close()
+        return archive
+
+    def get(self, bbox, width, height, datetime):
+        if datetime.tzinfo is not None:
+            # the archives are in utc
+            datetime = (datetime - datetime.utcoffset()).replace(tzinfo=None)
+        with self.lock:
+            archive = self._file(self.path(datetime))
+            i = archive.index.get(datetime)
+            if i is None:
+                logger.warning('No radar frame at %s in %s, no rain',
+                               datetime, archive.path)
+                return np.zeros((height, width))
+            frame = archive.frame(i, bbox, width, height)
+        if self.factor != 1.0:
+            frame *= self.factor
+        return frame
+
+    def close(self):
+        with self.lock:
+            for archive in self.files.values():
+                archive.close()
+            self.files.clear()
@@ -3,16 +3,26 @@
 from __future__ import division
 
 import datetime
+import hashlib
 import logging
 import math
 import os
 import tempfile
-import urllib
-import urlparse
+import uuid
+try:
+    from urllib.parse import urlencode, urljoin
+    from urllib.request import urlopen
+except ImportError:
+    # python 2
+    from urllib import urlencode, urlopen
+    from urlparse import urljoin
 
 from osgeo import gdal
 import netCDF4
 import numpy as np
+import scipy.sparse
+
+from python_subgrid.radar import RasterServerSource
 
 
 logger = logging.getLogger(__name__)
@@ -53,19 +63,17 @@ def get_rain(bbox, width, height, datetime,
                       'time': datetime.isoformat(),
                       'geom': POLYGON.format(x1=x1, y1=y1, x2=x2, y2=y2)}
 
-        url = '{path}?{pars}'.format(pars=urllib.urlencode(parameters),
-                                     path=urlparse.urljoin(server, 'data'))
+        url = '{path}?{pars}'.format(pars=urlencode(parameters),
+                                     path=urljoin(server, 'data'))
         logger.info('Loading rain data from %s...' % url)
 
-        # receive tif into temporary file
-        fileno, path = tempfile.mkstemp()
-        url_file = urllib.urlopen(url)
-        os.write(fileno, url_file.read())
-        os.close(fileno)
-
-        # read array and remove tempfile
-        rain = gdal.Open(path).ReadAsArray()
-        os.remove(path)
+        # read the tif from memory, no temporary file
+        path = '/vsimem/rain-{}.tif'.format(uuid.uuid4().hex)
+        gdal.FileFromMemBuffer(path, urlopen(url).read())
+        try:
+            rain = gdal.Open(path).ReadAsArray()
+        finally:
+            gdal.Unlink(path)
         return rain
 
 
@@ -73,17 +81,29 @@ class RainGrid(object):
     """
     Manage a rain grid.
 
+    The rainfall (in m/min) is kept in memory in :attr:`rainfall`, the first
+    row is the southern row (at ``y[0]``), like the rows of the model. If
+    ``memcdf_name`` is not None, it's also written to that netCDF file, which
+    the model can read with ``subscribe_dataset``. Use
+    :class:`ModelRainForcing` to write the rain into the model directly.
+
     Only works on the Netherlands.
     """
     def __init__(self, subgrid, url_template=None,
                  memcdf_name='precipitation.nc',
-                 size_x=None, size_y=None, initial_value=0.0):
+                 size_x=None, size_y=None, initial_value=0.0, cache=None,
+                 source=None):
         """subgrid is used to initialize the rain grid.
 
         url_template is needed in function update: it fetches data from an
         opendap server
+
+        Radar frames are read from source (a
+        :class:`~python_subgrid.radar.RainSource`), by default from the
+        raster server, through cache (a
+        :class:`~python_subgrid.radar.RadarFrameCache`) if given.
         """
-        if not url_template:
+        if not url_template and source is None:
             logger.warning('No url_template given.')
         if size_x:
             logger.warning('Ignoring deprecated keyword argument: size_x')
@@ -93,6 +113,13 @@ class RainGrid(object):
         self.dt_current = None
         self.memcdf_name = memcdf_name
         self.diskless = False
+        if source is None:
+            source = RasterServerSource(cache=cache)
+        self.source = source
+        # increased on every change of the rainfall
+        self.version = 0
+        # tells the versions of grids in the same netCDF file apart
+        self.uid = uuid.uuid4().hex
 
         # Read pixels in model to inspect bathymetry width, height and bbox
         width = subgrid.get_nd('imax') + 1
@@ -122,30 +149,43 @@ class RainGrid(object):
 
         self.width = width
         self.height = height
+        self.dx = dx
+        self.dy = dy
+        self.x = np.linspace(x1 + dx / 2, x2 - dx / 2, width)
+        # rainfall rows go from south to north, like the model rows
+        south, north = sorted([y1, y2])
+        step = abs(dy)
+        self.y = np.linspace(south + step / 2, north - step / 2, height)
+        self.rainfall = np.empty((height, width))
 
+        logger.info('Creating a %i x %i rain grid.', width, height)
+        if self.memcdf_name:
+            self._create_memcdf()
+        self.fill(initial_value)
+
+    def _create_memcdf(self):
         # TODO: replace precipitation.nc with a unique name
         # TODO: add diskless=True, requires netcdf version >= 4.2.x
         # For now use netcdf classic, issue with netcdf redefinition in hdf5
         # format
-        logger.info('Creating a %i x %i rain grid.', width, height)
         memcdf = netCDF4.Dataset(self.memcdf_name,
                                  mode="w",
                                  diskless=self.diskless,
                                  format='NETCDF3_64BIT')
 
-        memcdf.createDimension("nx", width)
-        memcdf.createDimension("ny", height)
+        memcdf.createDimension("nx", self.width)
+        memcdf.createDimension("ny", self.height)
 
         # Put coordinates and values in the netcdf
         var = memcdf.createVariable(
             "x", datatype="double", dimensions=("nx",))
-        var[:] = np.linspace(x1 + dx / 2, x2 - dx / 2, width)
+        var[:] = self.x
         var.standard_name = 'projected_x_coordinate'
         var.units = 'm'
 
         var = memcdf.createVariable(
             "y", datatype="double", dimensions=("ny", ))
-        var[:] = np.linspace(y1 + dy / 2, y2 - dy / 2, height)
+        var[:] = self.y
         var.standard_name = 'projected_y_coordinate'
         var.units = 'm'
 
@@ -158,17 +198,31 @@ class RainGrid(object):
         rainfall_var.units = 'm/min'
         memcdf.close()
 
-        self.fill(initial_value)
-
-    def fill(self, value=0.0):
-        """Fill rainfall variable"""
+    def _write_memcdf(self):
+        """Write the rainfall to the netCDF file, if there is one"""
+        if not self.memcdf_name:
+            return
         memcdf = netCDF4.Dataset(
             self.memcdf_name, mode="r+", diskless=self.diskless)
         rainfall_var = memcdf.variables["rainfall"]
-        rainfall_var[:, :] = value
+        rainfall_var[:, :] = self.rainfall
+        # a container reads this instead of the rainfall, to see if it
+        # changed (fixed length, the header doesn't grow)
+        memcdf.setncattr('rain_version',
+                         '{}:{:012d}'.format(self.uid, self.version))
         memcdf.sync()
         memcdf.close()
 
+    def changed(self):
+        """Call after changing :attr:`rainfall` in place"""
+        self.version += 1
+        self._write_memcdf()
+
+    def fill(self, value=0.0):
+        """Fill rainfall variable"""
+        self.rainfall[:, :] = value
+        self.changed()
+
     def update(self, dt, multiplier=1.0):
         """Update the grid with rain at given datetime
 
@@ -181,22 +235,19 @@ class RainGrid(object):
             # Nothing to do
             return False
 
-        rain = get_rain(bbox=self.bbox,
-                        width=self.width,
-                        height=self.height,
-                        datetime=dt_request)[::-1]
+        # sources return the northern row first
+        rain = self.source.get(bbox=self.bbox,
+                               width=self.width,
+                               height=self.height,
+                               datetime=dt_request)[::-1]
 
-        memcdf = netCDF4.Dataset(self.memcdf_name,
-                                 mode="a",
-                                 diskless=self.diskless)
-        rainfall_var = memcdf.variables["rainfall"]
-        rain /= 5     # to mm/min
+        # cached frames are read-only
+        rain = rain / 5     # to mm/min
         rain /= 1000  # to m/min
         rain *= multiplier
 
-        rainfall_var[:] = rain
-        memcdf.sync()
-        memcdf.close()
+        self.rainfall[:, :] = rain
+        self.changed()
 
         logger.info('Rainfall maximum: %f', rain.max())
 
@@ -243,39 +294,261 @@ class AreaWideRainGrid(RainGrid):
 
 
 class RainGridContainer(RainGrid):
-    """Container for rain grids"""
-    def __init__(self, subgrid, url_template='dummy', *args, **kwargs):
+    """Container for rain grids.
+
+    The rainfall is the sum of the registered grids. The container keeps a
+    copy of what every grid contributed to the sum, so an update only
+    subtracts the old and adds the new rainfall of the grids that changed
+    (see :attr:`RainGrid.version`, grids in netCDF files write it in the
+    file), registered or unregistered. After ``resum_every`` incremental
+    updates the sum is recalculated, to get rid of rounding errors.
+
+    With ``forcing=True`` the sum is written in the model's rain array after
+    every :meth:`update` that changed it (see :class:`ModelRainForcing`,
+    its weights are kept in ``cache_dir``), pass ``memcdf_name=None`` to
+    skip the netCDF file in that case.
+    """
+    def __init__(self, subgrid, url_template='dummy',
+                 memcdf_name='container_grid.nc', forcing=False,
+                 resum_every=1000, cache_dir=None, *args, **kwargs):
         self.grid_names = set([])
-        self.memcdf_name = 'container_grid.nc'
+        # in memory grids by name, the others are read from their netCDF
+        self.grids = {}
+        # what every grid added to the sum, by name: (version, rainfall)
+        self.contributions = {}
+        self.resum_every = resum_every
+        self.n_incremental = 0
+        self.memcdf_name = memcdf_name
         super(RainGridContainer, self).__init__(
             subgrid, url_template,
             memcdf_name=self.memcdf_name, *args, **kwargs)
+        self.forcing = None
+        if forcing:
+            self.forcing = ModelRainForcing(subgrid, self,
+                                            cache_dir=cache_dir)
 
-    def register(self, name):
+    def register(self, name, grid=None):
+        """Add grid name, the netCDF file name unless the grid is given"""
         self.grid_names.add(name)
+        if grid is not None:
+            self.grids[name] = grid
 
     def unregister(self, name):
         self.grid_names.remove(name)
+        self.grids.pop(name, None)
+
+    def _grid_version(self, name):
+        if name in self.grids:
+            return self.grids[name].version
+        # the version that the grid wrote in its netCDF file
+        _memcdf = netCDF4.Dataset(name, mode="r", diskless=False)
+        version = getattr(_memcdf, 'rain_version', None)
+        _memcdf.close()
+        if version is None:
+            # written by someone else, assume it changed
+            return object()
+        return version
+
+    def _grid_rainfall(self, name):
+        if name in self.grids:
+            return self.grids[name].rainfall
+        _memcdf = netCDF4.Dataset(name, mode="r", diskless=False)
+        rainfall = _memcdf.variables["rainfall"][:, :]
+        _memcdf.close()
+        return rainfall
 
     def update(self):
-        """Recalculate sum of grids"""
-        memcdf = netCDF4.Dataset(self.memcdf_name, mode="a", diskless=False)
-        rainfall_var = memcdf.variables["rainfall"]
-
-        if not self.grid_names:
-            rainfall_var[:, :] = 0
-        first = True
-        for grid_name in self.grid_names:
-            _memcdf = netCDF4.Dataset(grid_name, mode="r+", diskless=False)
-            if first:
-                rainfall_var[:, :] = _memcdf.variables["rainfall"][:, :]
-                first = False
+        """Update the sum of the grids that changed, return whether the sum
+        changed"""
+        rainfall = self.rainfall
+        contributions = self.contributions
+        changed = False
+        for name in set(contributions) - self.grid_names:
+            logger.debug('Removing rain grid %s', name)
+            rainfall -= contributions.pop(name)[1]
+            changed = True
+        for name in self.grid_names:
+            version = self._grid_version(name)
+            old = contributions.get(name)
+            if old is not None and old[0] == version:
+                continue
+            current = self._grid_rainfall(name)
+            if old is None:
+                contribution = np.array(current, dtype='double')
             else:
-                rainfall_var[:, :] += _memcdf.variables["rainfall"][:, :]
-            _memcdf.close()
-        memcdf.sync()
-        memcdf.close()
+                # subtract the old, add the new
+                contribution = old[1]
+                rainfall -= contribution
+                contribution[:, :] = current
+            rainfall += contribution
+            contributions[name] = version, contribution
+            changed = True
+        if not changed:
+            return False
+        self.n_incremental += 1
+        if not contributions:
+            rainfall[:, :] = 0
+        elif self.n_incremental >= self.resum_every:
+            self.resum()
+        self.changed()
+        if self.forcing is not None:
+            self.forcing.apply()
+        return True
+
+    def resum(self):
+        """Recalculate the sum from the contributions"""
+        rainfall = self.rainfall
+        rainfall[:, :] = 0
+        for _, contribution in self.contributions.values():
+            rainfall += contribution
+        self.n_incremental = 0
 
     def delete_memcdf(self):
-        if os.path.exists(self.memcdf_name):
+        if self.memcdf_name and os.path.exists(self.memcdf_name):
             os.remove(self.memcdf_name)
+
+
+def _pixel_ranges(edges, lower, upper):
+    """Return the first pixel and the number of pixels between lower and
+    upper, and those bounds in pixels (the edges are regular)"""
+    step = edges[1] - edges[0]
+    lower = (lower - edges[0]) / step
+    upper = (upper - edges[0]) / step
+    lower, upper = np.minimum(lower, upper), np.maximum(lower, upper)
+    n = len(edges) - 1
+    first = np.clip(np.floor(lower), 0, n).astype('int64')
+    last = np.clip(np.ceil(upper), 0, n).astype('int64')
+    return first, np.maximum(last - first, 0), lower, upper
+
+
+def area_weights(cell_x, cell_y, pixel_x, pixel_y):
+    """Return the sparse matrix from the pixels of a grid to cells.
+
+    The cells are rectangles with edges ``cell_x`` and ``cell_y`` (arrays
+    of n x 2), the grid has regular edges ``pixel_x`` and ``pixel_y``
+    (width + 1 and height + 1, in the order of the rows and columns). Row i
+    of the matrix has the fractions of cell i that the pixels (numbered row
+    by row) cover, of the part of the cell inside the grid. The product
+    with a raveled grid is the area weighted mean of every cell, cells
+    outside the grid have an empty row.
+    """
+    width = len(pixel_x) - 1
+    height = len(pixel_y) - 1
+    first_col, n_cols, left, right = _pixel_ranges(
+        pixel_x, cell_x[:, 0], cell_x[:, 1])
+    first_row, n_rows, bottom, top = _pixel_ranges(
+        pixel_y, cell_y[:, 0], cell_y[:, 1])
+    # one entry for every pixel of every cell
+    counts = n_cols * n_rows
+    cells = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(counts.cumsum() - counts,
+                                                  counts)
+    n_cols = n_cols[cells]
+    cols = first_col[cells] + offsets % np.maximum(n_cols, 1)
+    rows = first_row[cells] + offsets // np.maximum(n_cols, 1)
+    weights = ((np.minimum(right[cells], cols + 1) -
+                np.maximum(left[cells], cols)) *
+               (np.minimum(top[cells], rows + 1) -
+                np.maximum(bottom[cells], rows)))
+    overlap = weights > 0
+    cells = cells[overlap]
+    weights = weights[overlap]
+    weights /= np.bincount(cells, weights, minlength=len(counts))[cells]
+    return scipy.sparse.csr_matrix(
+        (weights, (cells, rows[overlap] * width + cols[overlap])),
+        shape=(len(counts), width * height))
+
+
+class ModelRainForcing(object):
+    """Write the rainfall of a rain grid in the model's ``rain`` array.
+
+    This replaces the round trip through a netCDF file and
+    ``subscribe_dataset``. The 2d cells take the area weighted mean of the
+    pixels of the grid they overlap, the weights are a sparse matrix (see
+    :func:`area_weights`), so the rainfall is mapped on the cells with one
+    matrix-vector product. Cells outside the grid are left alone. The
+    rainfall of the grid (m/min) is converted to the unit of the model's
+    ``rain`` (m/s) and multiplied by ``factor``.
+
+    The weights only depend on the grids. With ``cache_dir`` they are saved
+    there and reused by the next run of the same model.
+    """
+    def __init__(self, subgrid, grid, factor=1.0, cache_dir=None):
+        self.subgrid = subgrid
+        self.grid = grid
+        self.factor = factor
+        quad = subgrid.get_many(['dxp', 'dyp', 'imaxk', 'jmaxk', 'nodk',
+                                 'nod_type', 'FlowElem_xcc', 'FlowElem_ycc'],
+                                sliced=False)
+        path = None
+        if cache_dir:
+            path = os.path.join(
+                cache_dir, 'rain-weights-{}.npz'.format(self.key(quad, grid)))
+        if path and os.path.exists(path):
+            logger.debug('Reading rain weights from %s', path)
+            with np.load(path) as saved:
+                self.cells = saved['cells']
+                self.weights = scipy.sparse.csr_matrix(
+                    (saved['data'], saved['indices'], saved['indptr']),
+                    shape=tuple(saved['shape']))
+        else:
+            self.cells, self.weights = self._area_weights(quad, grid)
+            if path:
+                self._save(path)
+        logger.info('Forcing rain on %d cells', len(self.cells))
+
+    @staticmethod
+    def key(quad, grid):
+        """Return the sha1 of the quad cells and the grid"""
+        sha1 = hashlib.sha1()
+        sha1.update(repr([tuple(float(x) for x in grid.bbox),
+                          int(grid.width), int(grid.height)]).encode('utf-8'))
+        for name in sorted(quad):
+            sha1.update(np.ascontiguousarray(quad[name]).tobytes())
+        return sha1.hexdigest()
+
+    def _area_weights(self, quad, grid):
+        """Return the rain array indices of the 2d cells in the grid and
+        their weights"""
+        # node numbers (0 based, without the dummy node) of the 2d cells
+        nodes = np.flatnonzero(quad['nod_type'][1:] == 1)
+        k = quad['nodk'][nodes].astype('int64') - 1
+        size_x = quad['imaxk'][k] * abs(float(quad['dxp']))
+        size_y = quad['jmaxk'][k] * abs(float(quad['dyp']))
+        # the cell centres have the dummy node
+        x = quad['FlowElem_xcc'][nodes + 1]
+        y = quad['FlowElem_ycc'][nodes + 1]
+        # pixel edges, south to north like the rows of the rainfall
+        half_x, half_y = abs(grid.dx) / 2, abs(grid.dy) / 2
+        weights = area_weights(
+            np.column_stack([x - size_x / 2, x + size_x / 2]),
+            np.column_stack([y - size_y / 2, y + size_y / 2]),
+            np.append(grid.x - half_x, grid.x[-1] + half_x),
+            np.append(grid.y - half_y, grid.y[-1] + half_y))
+        inside = np.diff(weights.indptr) > 0
+        # the rain array has the dummy node
+        return nodes[inside] + 1, weights[inside]
+
+    def _save(self, path):
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # write and rename, other runs never see half a file
+        fileno, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz')
+        with os.fdopen(fileno, 'wb') as f:
+            np.savez(f, cells=self.cells, data=self.weights.data,
+                     indices=self.weights.indices,
+                     indptr=self.weights.indptr,
+                     shape=np.array(self.weights.shape))
+        os.rename(tmp_path, path)
+
+    def apply(self):
+        """Write the current rainfall in the model"""
+        # the fortran memory, also in shared memory mode
+        rain = self.subgrid._fortran_array('rain')
+        if rain is None:
+            logger.warning('No rain array in the model')
+            return
+        rainfall = self.grid.rainfall.ravel()
+        # m/min to m/s
+        rain[self.cells] = self.weights.dot(rainfall) * (self.factor / 60.0)
@@ -0,0 +1,104 @@
+"""
+Named shared memory arrays.
+
+The wrapper (``SubgridWrapper(sharedmem=True)``) keeps a copy of every
+variable that is requested in a named segment. The segments are files in a
+memory backed file system (``/dev/shm`` if available), so other processes,
+like renderers, can attach them by name without copying::
+
+    s1 = attach_shared('subgrid-1234-s1')
+
+A small json file next to the segment describes the dtype and shape.
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+def shared_directory():
+    """Return the directory where shared segments are stored.
+
+    Set the ``SUBGRID_SHM_DIR`` environment variable to override the default
+    (``/dev/shm`` or the temporary directory).
+    """
+    directory = os.environ.get('SUBGRID_SHM_DIR')
+    if directory:
+        return directory
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def _paths(name, directory=None):
+    """Return path of the segment and of its metadata"""
+    path = os.path.join(directory or shared_directory(), name)
+    return path, path + '.json'
+
+
+def _memmap(path, dtype, shape, mode):
+    """Return a fortran ordered memory mapped array of shape"""
+    size = int(np.prod(shape))
+    # mmap can't map empty files, scalars and empty arrays get 1 element
+    flat = np.memmap(path, dtype=dtype, mode=mode, shape=(max(size, 1), ))
+    return flat[:size].reshape(shape, order='F')
+
+
+class SharedArray(object):
+    """A fortran ordered array in a named shared memory segment.
+
+    The segment is allocated once and refreshed in place.
+    """
+
+    def __init__(self, name, shape, dtype, directory=None):
+        self.name = name
+        self.shape = tuple(int(x) for x in shape)
+        self.dtype = np.dtype(dtype)
+        self.path, self.metadata_path = _paths(name, directory)
+        self.array = _memmap(self.path, self.dtype, self.shape, mode='w+')
+        metadata = {
+            'dtype': self.dtype.str,
+            'shape': list(self.shape),
+            'order': 'F'
+        }
+        # write the metadata last, so readers never find a half segment
+        tmp_path = self.metadata_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(metadata, f)
+        os.rename(tmp_path, self.metadata_path)
+        logger.debug("Allocated shared segment %s %s %s",
+                     self.path, self.dtype, self.shape)
+
+    def refresh(self, source):
+        """Copy source into the segment"""
+        self.array[...] = source
+
+    def close(self):
+        """Remove the segment, attached readers keep their mapping"""
+        self.array = None
+        for path in (self.metadata_path, self.path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __repr__(self):
+        return "<SharedArray {} {} {}>".format(
+            self.name, self.dtype, self.shape)
+
+
+def attach_shared(name, directory=None, writable=False):
+    """Return the array in the shared segment name.
+
+    The array is read-only unless writable is True.
+    """
+    path, metadata_path = _paths(name, directory)
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    mode = 'r+' if writable else 'r'
+    return _memmap(path, np.dtype(str(metadata['dtype'])),
+                   tuple(metadata['shape']), mode=mode)
@@ -0,0 +1,110 @@
+"""
+In-memory copies of the model state.
+
+See :meth:`~python_subgrid.wrapper.SubgridWrapper.snapshot` and
+:meth:`~python_subgrid.wrapper.SubgridWrapper.restore`::
+
+    subgrid.snapshot('before-breach')
+    # ... try a levee breach
+    subgrid.restore('before-breach')
+
+"""
+
+import collections
+import logging
+import zlib
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot(object):
+    """A copy of a set of variables, optionally compressed with zlib"""
+
+    def __init__(self, arrays, compress=False, level=1):
+        self.compressed = compress
+        # name -> (dtype, shape, data)
+        self.variables = collections.OrderedDict()
+        self.nbytes = 0
+        for name, array in arrays:
+            if compress:
+                data = zlib.compress(array.tobytes(order='F'), level)
+                nbytes = len(data)
+            else:
+                data = array.copy(order='F')
+                nbytes = data.nbytes
+            self.variables[name] = (array.dtype, array.shape, data)
+            self.nbytes += nbytes
+
+    def __contains__(self, name):
+        return name in self.variables
+
+    def __iter__(self):
+        return iter(self.variables)
+
+    def __getitem__(self, name):
+        """Return the array of variable name"""
+        dtype, shape, data = self.variables[name]
+        if self.compressed:
+            data = np.frombuffer(zlib.decompress(data), dtype=dtype)
+            data = data.reshape(shape, order='F')
+        return data
+
+    def __repr__(self):
+        return "<Snapshot of {} variables, {} bytes>".format(
+            len(self.variables), self.nbytes)
+
+
+class SnapshotStore(object):
+    """Named snapshots, the least recently used are dropped when the
+    snapshots take more than ``max_bytes`` (no limit if None).
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.snapshots = collections.OrderedDict()
+
+    @property
+    def nbytes(self):
+        return sum(snapshot.nbytes for snapshot in self.snapshots.values())
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def __contains__(self, name):
+        return name in self.snapshots
+
+    def __getitem__(self, name):
+        snapshot = self.snapshots.pop(name)
+        # most recently used
+        self.snapshots[name] = snapshot
+        return snapshot
+
+    def __setitem__(self, name, snapshot):
+        self.snapshots.pop(name, None)
+        self.snapshots[name] = snapshot
+        self.evict(keep=name)
+
+    def __delitem__(self, name):
+        del self.snapshots[name]
+
+    def evict(self, keep=None):
+        """Drop least recently used snapshots until we're within budget"""
+        if self.max_bytes is None:
+            return
+        nbytes = self.nbytes
+        for name in list(self.snapshots):
+            if nbytes <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            logger.debug("Dropping snapshot %s", name)
+            nbytes -= self.snapshots.pop(name).nbytes
+        if nbytes > self.max_bytes:
+            logger.warning("Snapshot %s alone exceeds the budget of %s bytes",
+                           keep, self.max_bytes)
+
+    def clear(self):
+        self.snapshots.clear()
@@ -0,0 +1,76 @@
+import sys
+import unittest
+
+import numpy as np
+
+if sys.version_info < (3, 7):
+    raise unittest.SkipTest("asyncio facade needs python 3.7")
+
+import asyncio  # noqa
+
+from python_subgrid.asyncsubgrid import AsyncSubgrid  # noqa
+
+
+class FakeSubgrid(object):
+    """Just the calls the facade needs"""
+
+    def __init__(self):
+        self.variables = {
+            't1': np.array(0.0),
+            'tend': np.array(30.0),
+            's1': np.zeros(3)
+        }
+
+    def update(self, dt):
+        self.variables['t1'] += 10
+        self.variables['s1'] += 1
+        return 0
+
+    def get_nd(self, name, sliced=False):
+        return self.variables[name]
+
+    def get_many(self, names, sliced=False):
+        return {name: self.variables[name] for name in names}
+
+
+class TestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.subgrid = FakeSubgrid()
+        self.model = AsyncSubgrid(self.subgrid)
+
+    def tearDown(self):
+        self.model.close()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_update(self):
+        self.loop.run_until_complete(self.model.update())
+        s1 = self.loop.run_until_complete(self.model.get_nd('s1'))
+        np.testing.assert_equal(s1, 1)
+        # a copy
+        self.subgrid.update(-1)
+        np.testing.assert_equal(s1, 1)
+
+    def test_concurrent_readers(self):
+        coroutines = [self.model.update()]
+        coroutines.extend(self.model.get_many(['t1', 's1'])
+                          for i in range(10))
+        results = self.loop.run_until_complete(asyncio.gather(*coroutines))
+        for values in results[1:]:
+            self.assertEqual(values['s1'][0], values['t1'] / 10)
+
+    def test_timesteps(self):
+        timesteps = self.model.timesteps(outputs=['s1'])
+        times = []
+        while True:
+            try:
+                t1, values = self.loop.run_until_complete(
+                    timesteps.__anext__())
+            except StopAsyncIteration:
+                break
+            times.append(t1)
+            self.assertEqual(values['s1'][0], t1 / 10)
+        self.assertEqual(times, [10.0, 20.0, 30.0])
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+from python_subgrid.checkpoint import CheckpointManager
+from python_subgrid.snapshots import Snapshot
+
+
+class FakeSubgrid(object):
+    """Just the state, as far as the checkpoint manager is concerned"""
+
+    def __init__(self):
+        self.state = {
+            's1': np.zeros(1000),
+            'nt': np.array(0, dtype='int32')
+        }
+
+    def snapshot(self, variables=None):
+        return Snapshot(self.state.items())
+
+    def restore(self, snapshot):
+        for name in snapshot:
+            self.state[name][...] = snapshot[name]
+
+    def get_nd(self, name):
+        return self.state.get(name, np.array(0.0))
+
+    def update(self, i):
+        # change a few blocks
+        self.state['s1'][i * 100:i * 100 + 10] += 1
+        self.state['nt'] += 1
+
+
+class TestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.subgrid = FakeSubgrid()
+        self.manager = CheckpointManager(self.subgrid, self.directory,
+                                         block_size=800)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_checkpoints(self, n):
+        states = {}
+        for i in range(n):
+            self.subgrid.update(i)
+            id_ = self.manager.checkpoint()
+            states[id_] = self.subgrid.state['s1'].copy()
+        return states
+
+    def test_deltas(self):
+        self.run_checkpoints(3)
+        checkpoints = self.manager.index['checkpoints']
+        # 10 blocks of s1 and 1 of nt
+        self.assertEqual(checkpoints[0]['blocks'], 11)
+        self.assertIsNone(checkpoints[0]['parent'])
+        # the changed block of s1 and nt
+        self.assertEqual(checkpoints[1]['blocks'], 2)
+        self.assertEqual(checkpoints[1]['parent'], checkpoints[0]['id'])
+
+    def test_restore(self):
+        states = self.run_checkpoints(5)
+        for id_ in [2, 4, 1, 5]:
+            self.manager.restore(id_)
+            npt.assert_equal(self.subgrid.state['s1'], states[id_])
+            self.assertEqual(self.subgrid.state['nt'], id_)
+
+    def test_branch(self):
+        states = self.run_checkpoints(3)
+        self.manager.restore(1)
+        self.subgrid.update(9)
+        id_ = self.manager.checkpoint()
+        self.assertEqual(self.manager.checkpoints[id_]['parent'], 1)
+        self.manager.restore(3)
+        npt.assert_equal(self.subgrid.state['s1'], states[3])
+
+    def test_compact(self):
+        states = self.run_checkpoints(5)
+        removed = self.manager.compact(3)
+        self.assertEqual(sorted(removed), [1, 2])
+        self.assertEqual(sorted(self.manager.checkpoints), [3, 4, 5])
+        for id_ in [3, 5]:
+            self.manager.restore(id_)
+            npt.assert_equal(self.subgrid.state['s1'], states[id_])
+        files = [name for name in os.listdir(self.directory)
+                 if name.endswith('.npz')]
+        self.assertEqual(len(files), 3)
+
+    def test_reopen(self):
+        states = self.run_checkpoints(3)
+        manager = CheckpointManager(self.subgrid, self.directory,
+                                    block_size=800)
+        manager.restore(2)
+        npt.assert_equal(self.subgrid.state['s1'], states[2])
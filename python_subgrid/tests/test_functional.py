@@ -285,6 +285,189 @@ class TestCase(unittest.TestCase):
             logging.debug(t1)
             npt.assert_almost_equal(t1, 5*30)
 
+    @printinfo
+    def test_get_nd_metadata_cache(self):
+        with SubgridWrapper(mdu=self.default_mdu) as subgrid:
+            subgrid.initmodel()
+            subgrid.get_nd('s1')
+            subgrid.get_nd('s1')
+            self.assertEqual(subgrid.metadata.misses, 1)
+            self.assertEqual(subgrid.metadata.hits, 1)
+            # variables can be reallocated by initmodel
+            subgrid.initmodel()
+            self.assertNotIn('s1', subgrid.metadata)
+
+    @printinfo
+    def test_bind(self):
+        with SubgridWrapper(mdu=self.default_mdu) as subgrid:
+            subgrid.initmodel()
+            s1 = subgrid.bind('s1', sliced=True)
+            for i in range(3):
+                subgrid.update(-1)
+                npt.assert_equal(s1.array, subgrid.get_nd('s1', sliced=True))
+            # still valid after a reallocating call
+            subgrid.initmodel()
+            npt.assert_equal(np.asarray(s1), subgrid.get_nd('s1', sliced=True))
+
+    @printinfo
+    def test_get_many(self):
+        with SubgridWrapper(mdu=self.default_mdu) as subgrid:
+            subgrid.initmodel()
+            names = ['s1', 'u1', 'dps', 't1']
+            arrays = subgrid.get_many(names, copy=True)
+            self.assertEqual(set(arrays.keys()), set(names))
+            for name in names:
+                npt.assert_equal(arrays[name], subgrid.get_nd(name))
+            arrays = subgrid.get_many(names, sliced=True)
+            for name in names:
+                npt.assert_equal(arrays[name],
+                                 subgrid.get_nd(name, sliced=True))
+            self.assertRaises(NotDocumentedError, subgrid.get_many,
+                              ['s1', 'reinout'])
+
+    @printinfo
+    def test_get_waterlevels(self):
+        with SubgridWrapper(mdu=self.default_mdu) as subgrid:
+            subgrid.update(-1)
+            quad_grid = make_quad_grid(subgrid)
+            nodes = np.nonzero(subgrid.get_nd('nod_type')[1:] == 1)[0]
+            x0p = subgrid.get_nd('x0p')
+            y0p = subgrid.get_nd('y0p')
+            dxp = subgrid.get_nd('dxp')
+            rows, cols = np.nonzero(~quad_grid.mask)
+            rows, cols = rows[::97], cols[::97]
+            # pixel centers
+            xs = x0p + (cols + 0.5) * dxp
+            ys = y0p + (rows + 0.5) * dxp
+            index = subgrid.locate(xs, ys)
+            npt.assert_equal(index, nodes[quad_grid[rows, cols]])
+            s1 = subgrid.get_nd('s1', sliced=True)
+            npt.assert_equal(subgrid.get_waterlevels(xs, ys), s1[index])
+            # outside the grid
+            self.assertTrue(np.isnan(
+                subgrid.get_waterlevels([x0p - dxp], [y0p - dxp])[0]))
+            subgrid.update(-1)
+            s1 = subgrid.get_nd('s1', sliced=True)
+            npt.assert_equal(subgrid.get_waterlevels(xs, ys, index=index),
+                             s1[index])
+
+    @printinfo
+    def test_run_until(self):
+        with SubgridWrapper(mdu=self.default_mdu) as subgrid:
+            subgrid.update(-1)
+            dt = subgrid.get_nd('dt')
+            t_end = subgrid.get_nd('t1') + 4 * dt
+            times = []
+
+            def callback(subgrid):
+                times.append(float(subgrid.get_nd('t1')))
+
+            stats = subgrid.run_until(t_end, callback=callback, every=2)
+            self.assertGreaterEqual(subgrid.get_nd('t1'), t_end)
+            self.assertGreater(stats['steps'], 0)
+            self.assertEqual(stats['callbacks'], stats['steps'] // 2)
+            self.assertEqual(stats['callbacks'], len(times))
+            self.assertGreater(stats['total'], 0)
+            self.assertLessEqual(stats['min'], stats['mean'])
+            self.assertLessEqual(stats['mean'], stats['max'])
+
+    @printinfo
+    def test_instrumentation_restart(self):
+        subgrid = SubgridWrapper(mdu=self.default_mdu, instrument=True)
+        subgrid.start()
+        subgrid.update(-1)
+        subgrid.stop()
+        # the fortran functions are annotated again, and timed again
+        subgrid.start()
+        subgrid.update(-1)
+        self.assertEqual(subgrid.instrumentation['update'].count, 2)
+        subgrid.disable_instrumentation()
+        subgrid.update(-1)
+        self.assertFalse(hasattr(subgrid.update, 'instrumented'))
+        subgrid.stop()
+
+    @printinfo
+    def test_instrumentation_before_start(self):
+        subgrid = SubgridWrapper(mdu=self.default_mdu)
+        instrumentation = subgrid.enable_instrumentation()
+        subgrid.start()
+        subgrid.update(-1)
+        self.assertEqual(instrumentation['update'].count, 1)
+        subgrid.stop()
+
+    @printinfo
+    def test_snapshot(self):
+        with SubgridWrapper(mdu=self.default_mdu) as subgrid:
+            subgrid.update(-1)
+            t1 = subgrid.get_nd('t1').copy()
+            s1 = subgrid.get_nd('s1').copy()
+            subgrid.snapshot('start', compress=True)
+            for i in range(3):
+                subgrid.update(-1)
+            self.assertGreater(subgrid.get_nd('t1'), t1)
+            subgrid.restore('start')
+            self.assertEqual(subgrid.get_nd('t1'), t1)
+            npt.assert_equal(subgrid.get_nd('s1'), s1)
+
+    @printinfo
+    def test_ensemble(self):
+        from python_subgrid.ensemble import EnsembleRunner
+        from python_subgrid.tools.scenario import EventContainer
+        with SubgridWrapper(mdu=self.default_mdu) as subgrid:
+            subgrid.initmodel()
+            t1 = subgrid.get_nd('t1').copy()
+            t_end = t1 + 3 * subgrid.get_nd('dt')
+            runner = EnsembleRunner(subgrid, outputs=['s1'], t_end=t_end)
+            results = runner.run({'a': EventContainer(),
+                                  'b': EventContainer()})
+            self.assertEqual(sorted(results), ['a', 'b'])
+            for result in results.values():
+                self.assertIsNone(result['error'])
+                self.assertGreaterEqual(result['outputs'][-1][0], t_end)
+            # the parent didn't move
+            self.assertEqual(subgrid.get_nd('t1'), t1)
+
+    @printinfo
+    def test_pool(self):
+        from python_subgrid.pool import SubgridPool, WorkerError
+        from python_subgrid.pool import worker_context
+        if worker_context is None:
+            self.skipTest("Pools need the spawn start method")
+        with SubgridPool(processes=1, max_loads=2) as pool:
+            first = pool.load(self.default_mdu)
+            # waits for the worker
+            second = pool.load(self.default_mdu)
+            model = first.result()
+            self.assertFalse(second.done())
+            model.update(-1).result()
+            self.assertGreater(model.get_nd('t1').result(), 0)
+            self.assertRaises(WorkerError,
+                              model.get_nd('reinout').result)
+            model.release()
+            model = second.result()
+            self.assertEqual(model.get_nd('t1').result(), 0)
+            model.release()
+
+    @printinfo
+    def test_double_buffer(self):
+        with SubgridWrapper(mdu=self.default_mdu) as subgrid:
+            subgrid.initmodel()
+            subgrid.enable_double_buffer(['s1', 'u1'], every=2)
+            version, t1, arrays = subgrid.read_buffer()
+            subgrid.update(-1)
+            # not due yet
+            self.assertEqual(subgrid.read_buffer()[0], version)
+            subgrid.update(-1)
+            version, t1, arrays = subgrid.read_buffer(copy=True)
+            self.assertEqual(t1, subgrid.get_nd('t1'))
+            npt.assert_equal(arrays['s1'], subgrid.get_nd('s1', sliced=True))
+            subgrid.update(-1)
+            subgrid.update(-1)
+            # the copy is ours
+            self.assertEqual(subgrid.read_buffer()[0], version + 1)
+            self.assertFalse(np.may_share_memory(
+                arrays['s1'], subgrid.read_buffer()[2]['s1']))
+
     @printinfo
     def test_get_nd_unknown_variable(self):
         with SubgridWrapper(mdu=self.default_mdu) as subgrid:
@@ -0,0 +1,49 @@
+import json
+import unittest
+
+from python_subgrid.instrumentation import Instrumentation
+
+
+class TestCase(unittest.TestCase):
+
+    def test_wrap(self):
+        instrumentation = Instrumentation()
+        add = instrumentation.wrap('add', lambda a, b: a + b)
+        self.assertEqual(add(1, 2), 3)
+        self.assertEqual(add(3, 4), 7)
+        self.assertEqual(instrumentation['add'].count, 2)
+        self.assertGreaterEqual(instrumentation['add'].total, 0)
+
+    def test_exception_is_counted(self):
+        instrumentation = Instrumentation()
+        fail = instrumentation.wrap('fail', lambda: 1 / 0)
+        self.assertRaises(ZeroDivisionError, fail)
+        self.assertEqual(instrumentation['fail'].count, 1)
+
+    def test_percentiles(self):
+        instrumentation = Instrumentation(max_samples=100)
+        stats = instrumentation['update']
+        for i in range(200):
+            stats.record(float(i))
+        # only the last 100 samples
+        self.assertEqual(stats.percentiles([0.0, 1.0]), [100.0, 199.0])
+        self.assertEqual(stats.count, 200)
+
+    def test_to_json(self):
+        instrumentation = Instrumentation()
+        instrumentation['update'].record(0.5)
+        # not called, not exported
+        instrumentation['get_nd']
+        summary = json.loads(instrumentation.to_json())
+        self.assertEqual(list(summary.keys()), ['update'])
+        self.assertEqual(summary['update']['count'], 1)
+        self.assertEqual(summary['update']['p50'], 0.5)
+
+    def test_to_prometheus(self):
+        instrumentation = Instrumentation()
+        instrumentation['update'].record(0.5)
+        text = instrumentation.to_prometheus()
+        self.assertIn('subgrid_calls_total{function="update"} 1\n', text)
+        self.assertIn(
+            'subgrid_call_seconds{function="update",quantile="0.5"} 0.5\n',
+            text)
@@ -0,0 +1,205 @@
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from urllib.parse import parse_qs, urlencode, urlparse
+    from urllib.request import urlopen
+except ImportError:
+    # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from urllib import urlencode, urlopen
+    from urlparse import parse_qs, urlparse
+
+import iso8601
+import numpy as np
+import numpy.testing as npt
+
+from python_subgrid.radar import ArchiveSource, RadarFrameCache, RainSource
+
+
+class RadarHandler(BaseHTTPRequestHandler):
+    """Stand-in for the raster server, the frame is filled with the minute
+    of the requested time"""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        self.server.requests.append(query['time'][0])
+        time = datetime.datetime.strptime(query['time'][0],
+                                          '%Y-%m-%dT%H:%M:%S')
+        frame = np.empty((int(query['height'][0]), int(query['width'][0])))
+        frame.fill(time.minute)
+        f = io.BytesIO()
+        np.save(f, frame)
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(f.getvalue())
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), RadarHandler)
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.directory = tempfile.mkdtemp()
+        self.bbox = (0.0, 100.0, 100.0, 0.0)
+        self.time = datetime.datetime(2014, 10, 13, 12, 0)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def fetch(self, bbox, width, height, datetime):
+        url = 'http://127.0.0.1:{}/data?{}'.format(
+            self.server.server_port,
+            urlencode({'width': width, 'height': height,
+                       'time': datetime.isoformat()}))
+        return np.load(io.BytesIO(urlopen(url).read()))
+
+    def test_memory(self):
+        cache = RadarFrameCache(fetch=self.fetch)
+        frame = cache.get(self.bbox, 4, 3, self.time)
+        self.assertEqual(frame.shape, (3, 4))
+        self.assertIs(cache.get(self.bbox, 4, 3, self.time), frame)
+        self.assertFalse(frame.flags.writeable)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_lru(self):
+        cache = RadarFrameCache(max_frames=2, fetch=self.fetch)
+        for minutes in [0, 5, 10]:
+            cache.get(self.bbox, 4, 3,
+                      self.time + datetime.timedelta(minutes=minutes))
+        self.assertEqual(len(cache.frames), 2)
+        cache.get(self.bbox, 4, 3, self.time)
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_disk(self):
+        cache = RadarFrameCache(self.directory, fetch=self.fetch)
+        frame = cache.get(self.bbox, 4, 3, self.time)
+        # a new run with an empty memory
+        cache = RadarFrameCache(self.directory, fetch=self.fetch)
+        npt.assert_equal(cache.get(self.bbox, 4, 3, self.time), frame)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_key(self):
+        key = RadarFrameCache.key(self.bbox, 4, 3, self.time)
+        self.assertEqual(key, RadarFrameCache.key(self.bbox, 4, 3, self.time))
+        self.assertNotEqual(
+            key, RadarFrameCache.key(self.bbox, 4, 3, self.time,
+                                     layer='radar:hour'))
+
+    def test_prefetch(self):
+        cache = RadarFrameCache(self.directory, prefetch=3, fetch=self.fetch)
+        cache.get(self.bbox, 4, 3, self.time)
+        for minutes in [5, 10, 15]:
+            frame = cache.get(self.bbox, 4, 3,
+                              self.time + datetime.timedelta(minutes=minutes))
+            npt.assert_equal(frame, minutes)
+        cache.close()
+        # every frame is downloaded once, the last get prefetched 3 more
+        self.assertEqual(len(self.server.requests), 7)
+        self.assertEqual(len(set(self.server.requests)), 7)
+        self.assertEqual(cache.misses, 1)
+
+
+class TestArchiveSource(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.template = os.path.join(self.directory, 'RAD_{year}{month}.nc')
+        # northern row first, like the radar archives
+        self.write('RAD_201410.nc', datetime.datetime(2014, 10, 1), 3)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, filename, start, steps, dimensions=('time', 'y', 'x')):
+        import netCDF4
+        dataset = netCDF4.Dataset(os.path.join(self.directory, filename), 'w')
+        dataset.createDimension('time', steps)
+        dataset.createDimension('y', 10)
+        dataset.createDimension('x', 10)
+        time = dataset.createVariable('time', 'f8', ('time', ))
+        time.units = start.strftime('minutes since %Y-%m-%d %H:%M:%S')
+        time[:] = np.arange(steps) * 5
+        dataset.createVariable('x', 'f8', ('x', ))[:] = np.arange(10) + 0.5
+        dataset.createVariable('y', 'f8', ('y', ))[:] = 9.5 - np.arange(10)
+        # step * 100 + row * 10 + column
+        values = (np.arange(steps)[:, np.newaxis, np.newaxis] * 100 +
+                  np.arange(10)[:, np.newaxis] * 10 + np.arange(10))
+        axes = [('time', 'y', 'x').index(name) for name in dimensions]
+        dataset.createVariable('precipitation', 'f4', dimensions)[:] = (
+            values.transpose(axes))
+        dataset.close()
+
+    def expected(self, step):
+        # columns 2 to 5, rows 2 (y=7.5) to 6 (y=3.5)
+        return (step * 100 + np.arange(2, 7)[:, np.newaxis] * 10 +
+                np.arange(2, 6))
+
+    def test_get(self):
+        source = ArchiveSource(self.template)
+        bbox = (2.0, 6.0, 3.0, 8.0)
+        frame = source.get(bbox, 4, 5, datetime.datetime(2014, 10, 1, 0, 5))
+        npt.assert_equal(frame, self.expected(1))
+        frame = source.get(bbox, 4, 5, datetime.datetime(2014, 10, 1, 0, 10))
+        npt.assert_equal(frame, self.expected(2))
+        self.assertEqual(len(source.files), 1)
+        source.close()
+
+    def test_resample(self):
+        source = ArchiveSource(self.template)
+        frame = source.get((2.0, 6.0, 3.0, 8.0), 8, 10,
+                           datetime.datetime(2014, 10, 1))
+        npt.assert_equal(frame[::2, ::2], self.expected(0))
+        # outside the archive there's no rain
+        frame = source.get((8.0, 12.0, 3.0, 8.0), 4, 5,
+                           datetime.datetime(2014, 10, 1))
+        npt.assert_equal(frame[:, 2:], 0.0)
+        source.close()
+
+    def test_months(self):
+        self.write('RAD_201411.nc', datetime.datetime(2014, 11, 1), 1,
+                   dimensions=('y', 'x', 'time'))
+        source = ArchiveSource(self.template, max_files=1)
+        bbox = (2.0, 6.0, 3.0, 8.0)
+        source.get(bbox, 4, 5, datetime.datetime(2014, 10, 1))
+        frame = source.get(bbox, 4, 5, datetime.datetime(2014, 11, 1))
+        npt.assert_equal(frame, self.expected(0))
+        self.assertEqual(list(source.files),
+                         [os.path.join(self.directory, 'RAD_201411.nc')])
+        source.close()
+
+    def test_interface(self):
+        self.assertRaises(TypeError, RainSource)
+        source = ArchiveSource(self.template)
+        self.assertTrue(isinstance(source, RainSource))
+        source.close()
+
+    def test_timezone(self):
+        source = ArchiveSource(self.template)
+        bbox = (2.0, 6.0, 3.0, 8.0)
+        frame = source.get(bbox, 4, 5,
+                           iso8601.parse_date('2014-10-01T02:05:00+02:00'))
+        npt.assert_equal(frame, self.expected(1))
+        # not in the archive
+        frame = source.get(bbox, 4, 5,
+                           iso8601.parse_date('2014-10-01T03:00:00Z'))
+        npt.assert_equal(frame, 0.0)
+        source.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
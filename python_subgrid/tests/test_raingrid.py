@@ -1,11 +1,15 @@
 import logging
 import os
+import shutil
+import tempfile
 import unittest
 
 import netCDF4
 import numpy as np
 
 from python_subgrid.raingrid import AreaWideRainGrid
+from python_subgrid.raingrid import ModelRainForcing
+from python_subgrid.raingrid import area_weights
 from python_subgrid.raingrid import RainGrid
 from python_subgrid.raingrid import RainGridContainer
 from python_subgrid.tests.test_functional import scenarios
@@ -103,7 +107,7 @@ class TestCase(unittest.TestCase):
             'thredds/dodsC/radar/TF0005_A/{year}/{month}/01/'
             'RAD_TF0005_A_{year}{month}01000000.h5')
         container = RainGridContainer(subgrid)
-        RainGrid(
+        grid1 = RainGrid(
             subgrid, url_template, memcdf_name='1.nc', initial_value=1.)
         RainGrid(
             subgrid, url_template, memcdf_name='2.nc', initial_value=2.)
@@ -117,6 +121,14 @@ class TestCase(unittest.TestCase):
 
         self.assertEquals(memcdf_value(container.memcdf_name), 3)
 
+        # files that are rewritten quickly, within the mtime resolution
+        self.assertFalse(container.update())
+        grid1.fill(4.)
+        self.assertTrue(container.update())
+        grid1.fill(1.)
+        self.assertTrue(container.update())
+        self.assertEquals(memcdf_value(container.memcdf_name), 3)
+
         container.unregister('1.nc')
         container.update()
 
@@ -129,6 +141,76 @@ class TestCase(unittest.TestCase):
 
         self.assertRaises(KeyError, container.unregister, ('2.nc', ))
 
+    def test_container_forcing(self):
+        subgrid = python_subgrid.wrapper.SubgridWrapper(mdu=self.mdu)
+        subgrid.start()
+
+        container = RainGridContainer(subgrid, memcdf_name=None,
+                                      forcing=True)
+        grid1 = RainGrid(subgrid, memcdf_name=None, initial_value=1.)
+        grid2 = RainGrid(subgrid, memcdf_name=None, initial_value=2.)
+        container.register('1', grid1)
+        container.register('2', grid2)
+        self.assertTrue(container.update())
+
+        self.assertEquals(container.rainfall[10, 10], 3)
+        rain = subgrid.get_nd('rain')
+        np.testing.assert_allclose(rain[container.forcing.cells], 3 / 60.)
+
+        # nothing changed
+        self.assertFalse(container.update())
+        # only the changed grid is subtracted and added again
+        grid2.fill(5.)
+        self.assertTrue(container.update())
+        np.testing.assert_allclose(rain[container.forcing.cells], 6 / 60.)
+
+        container.unregister('1')
+        container.update()
+        np.testing.assert_allclose(rain[container.forcing.cells], 5 / 60.)
+        subgrid.stop()
+
+    def test_area_weights(self):
+        # 4 x 2 pixels, northern row first
+        weights = area_weights(
+            np.array([[0.5, 1.5], [3., 5.], [10., 11.]]),
+            np.array([[0., 2.], [1., 2.], [0., 1.]]),
+            np.arange(5.), np.array([2., 1., 0.]))
+        np.testing.assert_equal(weights.toarray(), [
+            [0.25, 0.25, 0, 0, 0.25, 0.25, 0, 0],
+            # the part of the cell inside the grid
+            [0, 0, 0, 1, 0, 0, 0, 0],
+            # outside
+            [0, 0, 0, 0, 0, 0, 0, 0]])
+
+    def test_forcing_weights_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        with SubgridWrapper(mdu=self.mdu) as subgrid:
+            grid = RainGrid(subgrid, memcdf_name=None, initial_value=1.)
+            forcing = ModelRainForcing(subgrid, grid, cache_dir=cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            cached = ModelRainForcing(subgrid, grid, cache_dir=cache_dir)
+            np.testing.assert_equal(cached.cells, forcing.cells)
+            self.assertEqual((cached.weights != forcing.weights).nnz, 0)
+            cached.apply()
+            rain = subgrid.get_nd('rain')
+            np.testing.assert_allclose(rain[cached.cells], 1 / 60.)
+        shutil.rmtree(cache_dir)
+
+    def test_forcing_north_south(self):
+        with SubgridWrapper(mdu=self.mdu) as subgrid:
+            grid = RainGrid(subgrid, memcdf_name=None, initial_value=0.)
+            # rain increases to the north
+            grid.rainfall[:, :] = grid.y[:, np.newaxis]
+            forcing = ModelRainForcing(subgrid, grid)
+            forcing.apply()
+            rain = subgrid.get_nd('rain')
+            ycc = subgrid.get_nd('FlowElem_ycc')
+            # the rain of a cell is the mean over its pixels, a linear field
+            # has its mean in the cell centre
+            np.testing.assert_allclose(rain[forcing.cells] * 60,
+                                       ycc[forcing.cells],
+                                       atol=abs(grid.dy))
+
     def test_area_wide_rain_grid(self):
         subgrid = python_subgrid.wrapper.SubgridWrapper(mdu=self.mdu)
         python_subgrid.wrapper.logger.setLevel(logging.DEBUG)
@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+from python_subgrid.sharedmem import SharedArray, attach_shared
+
+
+class TestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_attach(self):
+        shared = SharedArray('test-s1', (3, 2), 'int32',
+                             directory=self.directory)
+        shared.refresh(np.arange(6).reshape((3, 2)))
+        attached = attach_shared('test-s1', directory=self.directory)
+        self.assertEqual(attached.dtype, np.dtype('int32'))
+        self.assertTrue(attached.flags['F_CONTIGUOUS'])
+        npt.assert_equal(attached, np.arange(6).reshape((3, 2)))
+        # refreshed in place
+        shared.refresh(0)
+        npt.assert_equal(attached, 0)
+
+    def test_read_only(self):
+        shared = SharedArray('test-t1', (), 'double',
+                             directory=self.directory)
+        shared.refresh(30.0)
+        attached = attach_shared('test-t1', directory=self.directory)
+        self.assertEqual(attached, 30.0)
+        self.assertRaises(ValueError, attached.fill, 1.0)
+
+    def test_close(self):
+        shared = SharedArray('test-u1', (10, ), 'double',
+                             directory=self.directory)
+        shared.close()
+        self.assertEqual(os.listdir(self.directory), [])
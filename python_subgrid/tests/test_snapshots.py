@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+from python_subgrid.snapshots import Snapshot, SnapshotStore
+
+
+class TestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.s1 = np.asfortranarray(np.arange(12.0).reshape((3, 4)))
+
+    def test_copy(self):
+        snapshot = Snapshot([('s1', self.s1)])
+        self.s1[...] = 0
+        npt.assert_equal(snapshot['s1'], np.arange(12.0).reshape((3, 4)))
+        self.assertEqual(snapshot.nbytes, 12 * 8)
+
+    def test_compress(self):
+        s1 = np.zeros(10000)
+        snapshot = Snapshot([('s1', s1)], compress=True)
+        self.assertLess(snapshot.nbytes, s1.nbytes)
+        npt.assert_equal(snapshot['s1'], s1)
+        snapshot = Snapshot([('s1', self.s1)], compress=True)
+        npt.assert_equal(snapshot['s1'], self.s1)
+
+    def test_store_lru(self):
+        store = SnapshotStore(max_bytes=2 * 12 * 8)
+        store['a'] = Snapshot([('s1', self.s1)])
+        store['b'] = Snapshot([('s1', self.s1)])
+        # use a, so b is the least recently used
+        store['a']
+        store['c'] = Snapshot([('s1', self.s1)])
+        self.assertEqual(sorted(store.snapshots), ['a', 'c'])
+        self.assertEqual(store.nbytes, 2 * 12 * 8)
+
+    def test_store_too_large(self):
+        store = SnapshotStore(max_bytes=10)
+        store['a'] = Snapshot([('s1', self.s1)])
+        # the newest is kept anyway
+        self.assertIn('a', store)
@@ -2,6 +2,7 @@
 Test the library on desired behavior by running it on several models.
 """
 import os
+import time
 import unittest
 
 import numpy as np
@@ -99,6 +100,18 @@ class NobodyBotheredToGiveThisANameTestCase(unittest.TestCase):
             self.assertEqual(len(df), 1)
             logger.info(df.to_string())
 
+    @printinfo
+    def test_compound_records(self):
+        with SubgridWrapper(mdu=self._mdu_path('1dpumps')) as subgrid:
+            subgrid.initmodel()
+            records = subgrid.get_records('pumps')
+            df = subgrid.get_nd('pumps')
+            self.assertEqual(len(records), len(df))
+            npt.assert_equal(records.capacity, df['capacity'])
+            # the records are a view on the fortran memory
+            records.capacity[0] = 3.0
+            self.assertEqual(subgrid.get_nd('pumps')['capacity'][0], 3.0)
+
     @printinfo
     def test_pump_and_manhole(self):
         with SubgridWrapper(mdu=self._mdu_path('duifpolder')) as subgrid:
@@ -204,6 +217,60 @@ class NobodyBotheredToGiveThisANameTestCase(unittest.TestCase):
             oldcapacity = df.oldcapacity.item(0)
             self.assertEqual(oldcapacity, capacity0)
 
+    @printinfo
+    def test_set_structure_fields(self):
+        """compare (and time) bulk updates with the per call path"""
+        with SubgridWrapper(mdu=self._mdu_path('1d-democase')) as subgrid:
+            subgrid.initmodel()
+            df = subgrid.get_nd('pumps')
+            ids = list(df.id)
+            capacities = np.asarray(df.capacity) * 10
+            n = 100
+
+            tic = time.time()
+            for i in range(n):
+                for id, capacity in zip(ids, capacities):
+                    subgrid.set_structure_field('pumps', id,
+                                                'capacity', capacity)
+            per_call = time.time() - tic
+            npt.assert_equal(subgrid.get_nd('pumps').capacity, capacities)
+
+            tic = time.time()
+            for i in range(n):
+                subgrid.set_structure_fields('pumps', ids,
+                                             'capacity', capacities / 10,
+                                             direct=True)
+            bulk = time.time() - tic
+            npt.assert_equal(subgrid.get_nd('pumps').capacity,
+                             capacities / 10)
+            logger.info("setting %d pump capacities %d times: "
+                        "%.4fs per call, %.4fs in bulk",
+                        len(ids), n, per_call, bulk)
+            self.assertRaises(KeyError, subgrid.set_structure_fields,
+                              'pumps', ['no such pump'], 'capacity', 1.0,
+                              direct=True)
+            self.assertRaises(ValueError, subgrid.set_structure_fields,
+                              'pumps', ids, 'id', ids, direct=True)
+
+    @printinfo
+    def test_set_structure_fields_direct(self):
+        """the per call and direct paths give the same model state"""
+        states = []
+        for direct in [False, True]:
+            with SubgridWrapper(mdu=self._mdu_path('1d-democase')) as subgrid:
+                subgrid.initmodel()
+                df = subgrid.get_nd('pumps')
+                subgrid.set_structure_fields('pumps', list(df.id), 'capacity',
+                                             np.asarray(df.capacity) * 10,
+                                             direct=direct)
+                for i in range(5):
+                    subgrid.update(-1)
+                states.append((subgrid.get_nd('s1').copy(),
+                               subgrid.get_nd('q').copy(),
+                               subgrid.get_records('pumps').copy()))
+        for per_call, direct in zip(*states):
+            npt.assert_equal(per_call, direct)
+
     @printinfo
     def test_pump_it_up_is_active(self):
 
@@ -13,3 +13,11 @@ class TestCase(unittest.TestCase):
     def test_generate_functions_documentation(self):
         with mock.patch('__builtin__.open'):
             utils.generate_functions_documentation()
+
+
+class TestVariables(unittest.TestCase):
+
+    def test_variables_module_is_up_to_date(self):
+        # run utils.generate_variables_module if this fails
+        from python_subgrid.variables import VARIABLES
+        self.assertEqual(VARIABLES, utils.load_extracted_variables())
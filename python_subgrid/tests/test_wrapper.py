@@ -1,5 +1,8 @@
 import ctypes
 import os
+import subprocess
+import sys
+import threading
 import unittest
 
 import mock
@@ -40,6 +43,22 @@ class TestCase(unittest.TestCase):
         self.assertEquals(type(self.wrapper._load_library()),
                           ctypes.CDLL)
 
+    def test_load_library_cached(self):
+        library = self.wrapper._load_library()
+        self.assertIs(wrapper.SubgridWrapper()._load_library(), library)
+        self.assertIs(wrapper.preload_library(), library)
+        # annotated when it was loaded
+        self.assertEquals(library.get_var.argtypes,
+                          [ctypes.c_char_p, ctypes.c_void_p])
+
+    def test_library_path_cached(self):
+        path = self.wrapper._library_path()
+        self.assertTrue(os.path.isabs(path))
+        with mock.patch('os.path.exists') as exists:
+            exists.return_value = True
+            self.assertEquals(self.wrapper._library_path(), path)
+            exists.assert_called_once_with(path)
+
     def test_load_model_exception(self):
         self.wrapper.mdu = os.path.join(os.getcwd(), 'non-existing.mdu')
         # ^^^ in the current directory so the os.chdir() is OK.
@@ -57,5 +76,111 @@ class TestCase(unittest.TestCase):
         with wrapper.SubgridWrapper() as subgrid:
             self.assertEquals(subgrid.update.restype,
                               ctypes.c_int)
+
+    def test_pointer_marshaller(self):
+        marshal = wrapper.pointer_marshaller(ctypes.POINTER(ctypes.c_double))
+        pointer = marshal(1.5)
+        self.assertEquals(pointer.contents.value, 1.5)
+        # the same pointer is reused
+        self.assertIs(marshal(2), pointer)
+        self.assertEquals(pointer.contents.value, 2.0)
+        # but not by other threads
+        pointers = []
+        thread = threading.Thread(target=lambda: pointers.append(marshal(3)))
+        thread.start()
+        thread.join()
+        self.assertIsNot(pointers[0], pointer)
+        self.assertEquals(pointers[0].contents.value, 3.0)
+        self.assertEquals(pointer.contents.value, 2.0)
+
+    def test_pointer_marshaller_strict(self):
+        marshal = wrapper.pointer_marshaller(ctypes.POINTER(ctypes.c_double),
+                                             strict=True)
+        self.assertRaises(TypeError, marshal, '1.5')
+
+    def test_string_marshaller(self):
+        marshal = wrapper.string_marshaller()
+        buffer = marshal(b's1')
+        self.assertEquals(buffer.value, b's1')
+        self.assertIs(marshal(b's1'), buffer)
+        self.assertIsNot(marshal(b'u1'), buffer)
+
+    def test_string_marshaller_strict(self):
+        marshal = wrapper.string_marshaller(strict=True)
+        self.assertRaises(TypeError, marshal, 1)
+
+    def test_callback_buffer(self):
+        buffer = wrapper.CallbackBuffer(maxlen=2)
+        buffer.log(2, b'one')
+        buffer.log(2, b'two')
+        buffer.log(2, b'three')
+        self.assertEquals(buffer.dropped, 1)
+        with mock.patch.object(wrapper.logger, 'log') as log:
+            self.assertEquals(buffer.drain(), 2)
+            log.assert_called_with(wrapper.logging.INFO, b'three')
+        self.assertEquals(buffer.drain(), 0)
+
+    def test_callback_buffer_progress(self):
+        buffer = wrapper.CallbackBuffer(progress_interval=60)
+        for value in [0.0, 0.1, 0.2, 0.3, -1]:
+            buffer.progress(b'step', ctypes.pointer(ctypes.c_double(value)))
+        # start, the first update and stop
+        self.assertEquals(len(buffer.messages), 3)
+        self.assertEquals(buffer.coalesced, 2)
+        buffer.drain()
+
+    def test_parse_section(self):
+        self.assertEquals(wrapper.parse_section('1:nodall'), ((1, 'nodall'), ))
+        self.assertEquals(wrapper.parse_section('1,1:n2dtot'),
+                          (1, (1, 'n2dtot')))
+        self.assertEquals(wrapper.parse_section(None), None)
+
+    def test_section2index(self):
+        section = wrapper.parse_section('1:nodall')
+        # s1(0:nodall)
+        self.assertEquals(wrapper.section2index(section, (6, ), {'nodall': 5}),
+                          (slice(1, 6), ))
+        # unknown upper bound, the array starts at 0
+        self.assertEquals(wrapper.section2index(section, (6, ), {}),
+                          (slice(1, 6), ))
+        # s1(1:nodall), nothing to drop
+        self.assertEquals(wrapper.section2index(section, (5, ), {'nodall': 5}),
+                          (slice(0, 5), ))
+        # doesn't fit
+        self.assertEquals(wrapper.section2index(section, (3, ), {'nodall': 5}),
+                          None)
+        self.assertEquals(wrapper.section2index(section, (3, 3), {}), None)
+        section = wrapper.parse_section('1:lintot')
+        # aijl(0:linall), the 1d and boundary links are dropped
+        self.assertEquals(wrapper.section2index(section, (8, ), {'lintot': 5}),
+                          (slice(1, 6), ))
+        # aijl(1:lintot)
+        self.assertEquals(wrapper.section2index(section, (5, ), {'lintot': 5}),
+                          (slice(0, 5), ))
+        self.assertEquals(wrapper.section2index(section, (3, ), {'lintot': 5}),
+                          None)
+        section = wrapper.parse_section('1,1:n2dtot')
+        self.assertEquals(
+            wrapper.section2index(section, (2, 4), {'n2dtot': 4}),
+            (0, slice(0, 4)))
+
+    def test_catalogue(self):
+        for name, spec in wrapper.CATALOGUE.items():
+            self.assertTrue(name in wrapper.DOCUMENTED_VARIABLES)
+            if spec.section is not None:
+                self.assertEquals(len(spec.section), spec.rank)
+                # one definition per variable
+                self.assertFalse(name in wrapper.SLICES)
+
+    def test_import_is_lazy(self):
+        # heavy dependencies are imported when they're needed and importing
+        # the wrapper doesn't configure logging
+        code = ("import logging, sys; import python_subgrid.wrapper; "
+                "print(sorted(set(['pandas', 'pkg_resources']) & "
+                "set(sys.modules)), logging.root.handlers)")
+        output = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEquals(output.strip(), b'[] []')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -58,13 +58,15 @@ class RadarGrid(Event):
         self.memcdf_name = 'precipitation_%s.nc' % random_string(8)
         self.rain_grid_dt = None  # current radar datetime
 
-    def init(self, subgrid, radar_url_template):
+    def init(self, subgrid, radar_url_template=None, source=None):
+        """Create the rain grid, its frames are read from source (default:
+        the raster server)"""
         self.subgrid = subgrid
         self.radar_url_template = radar_url_template
+        # kept in memory, the container sums the grids
         self.rain_grid = RainGrid(
             subgrid, url_template=radar_url_template,
-            memcdf_name=self.memcdf_name,
-            size_x=500, size_y=500, initial_value=0.0)
+            memcdf_name=None, initial_value=0.0, source=source)
         self.rain_grid_dt = self.radar_dt
 
     def update(self, sim_time):
@@ -103,7 +105,7 @@ class AreaWideGrid(Event):
         self.subgrid = subgrid
         self.rain_grid = AreaWideRainGrid(
             subgrid,
-            memcdf_name=self.memcdf_name)
+            memcdf_name=None)
 
     def update(self, sim_time):
         """Update grid and apply. Return whether the grid has changed"""
@@ -209,15 +211,28 @@ class EventContainer(object):
             result.append('  event         : %s' % str(e))
         return result
 
-def apply_events(subgrid, scenario, rain_grid_container):
-    """Apply events that will occur during the current timestep."""
-    t1 = subgrid.get_nd('t1')
-    t0 = subgrid.get_nd('t0')
-    dt = subgrid.get_nd('dt')
+def apply_events(subgrid, scenario, rain_grid_container, radar_source=None,
+                 sim_time=None, window=None):
+    """Apply events that will occur during the current timestep.
+
+    Radar events read their frames from ``radar_source`` (a
+    :class:`~python_subgrid.radar.RainSource`, default: the raster
+    server).
+
+    To apply the events less often than every timestep, pass the model time
+    as ``sim_time`` and the time between the calls as ``window``: events
+    that start in the next or end in the previous ``window`` seconds are
+    started or finished."""
+    if sim_time is None:
+        t1 = subgrid.get_nd('t1')
+        t0 = subgrid.get_nd('t0')
+        dt = subgrid.get_nd('dt')
+        sim_time = float(t1)
+        previous_t = float(t0)
+    else:
+        dt = window
+        previous_t = sim_time - window
 
-    sim_time = float(t1)
-    previous_t = float(t0)
-    radar_url_template = 'http://opendap.nationaleregenradar.nl/thredds/dodsC/radar/TF0005_A/{year}/{month}/01/RAD_TF0005_A_{year}{month}01000000.h5'
     radar_grid_changed = False
     # starting scenario events
     events_init = scenario.events(
@@ -225,11 +240,11 @@ def apply_events(subgrid, scenario, rain_grid_container):
     for event in events_init:
         logger.info('Init event: %s' % str(event))
         if isinstance(event, RadarGrid):
-            event.init(subgrid, radar_url_template)
-            rain_grid_container.register(event.memcdf_name)
+            event.init(subgrid, source=radar_source)
+            rain_grid_container.register(event.memcdf_name, event.rain_grid)
         elif isinstance(event, AreaWideGrid):
             event.init(subgrid)
-            rain_grid_container.register(event.memcdf_name)
+            rain_grid_container.register(event.memcdf_name, event.rain_grid)
 
     # finished scenario events
     events_finish = scenario.events(
@@ -1,3 +1,4 @@
+import logging
 import os
 import sys
 
@@ -5,10 +6,7 @@ from python_subgrid.wrapper import SubgridWrapper
 
 
 def main():
+    logging.basicConfig()
     mdu_path = os.path.abspath(sys.argv[1])
     with SubgridWrapper(mdu=mdu_path, set_logger=False) as subgrid:
-        tend = subgrid.get_nd('tend')
-        time = subgrid.get_nd('t1')
-        while(time < tend):
-            subgrid.update(-1)
-            time = subgrid.get_nd('t1')
+        subgrid.run_until(subgrid.get_nd('tend'))
@@ -11,6 +11,8 @@ import sys
 from python_subgrid.tests.utils import colorlogs
 from python_subgrid.tools.scenario import apply_events, clean_events
 from python_subgrid.raingrid import AREA_WIDE_RAIN, RainGridContainer
+from python_subgrid.radar import ArchiveSource, RadarFrameCache
+from python_subgrid.radar import RasterServerSource
 from python_subgrid.tools.scenario import AreaWideGrid
 from python_subgrid.tools.scenario import EventContainer
 from python_subgrid.tools.scenario import RadarGrid
@@ -41,6 +43,21 @@ def parse_args():
     argumentparser.add_argument(
         "--radar",
         help="radar rain from t=0, dt in iso8601 (2013-10-13T00:00:00Z)")
+    argumentparser.add_argument(
+        "--radar-archive",
+        help="read radar rain from local archives instead of the raster "
+        "server, path with {year}, {month} and {day}")
+    argumentparser.add_argument(
+        "--radar-cache",
+        help="directory to keep downloaded radar frames and rain weights "
+        "in")
+    argumentparser.add_argument(
+        "--radar-prefetch",
+        help="number of radar frames to download ahead", type=int, default=3)
+    argumentparser.add_argument(
+        "--radar-forcing",
+        help="write the rain in the model directly instead of through a "
+        "netCDF file", default=False, action='store_true')
     argumentparser.add_argument(
         "--color",
         help="Color logs", default=False, action='store_true')
@@ -63,6 +80,8 @@ def main():
         # redirect stdout to /dev/null under osx so we get only 1 output stream
         f = open(os.devnull, 'w')
         sys.stderr = f
+    # only configures logging if colorlogs didn't
+    logging.basicConfig()
 
     logger.info('Subgridpy')
     logger.setLevel(logging.DEBUG)
@@ -95,9 +114,21 @@ def main():
     # Should not be needed
     # subgrid.library.initmodel()
 
-    rain_grid_container = RainGridContainer(subgrid)
-    if arguments.radar:
-        subgrid.subscribe_dataset(rain_grid_container.memcdf_name)
+    if arguments.radar_forcing:
+        # rain is written in the model directly, no netCDF file
+        rain_grid_container = RainGridContainer(
+            subgrid, memcdf_name=None, forcing=True,
+            cache_dir=arguments.radar_cache)
+    else:
+        rain_grid_container = RainGridContainer(subgrid)
+        if arguments.radar:
+            subgrid.subscribe_dataset(rain_grid_container.memcdf_name)
+    if arguments.radar_archive:
+        radar_source = ArchiveSource(arguments.radar_archive)
+    else:
+        radar_source = RasterServerSource(cache=RadarFrameCache(
+            directory=arguments.radar_cache,
+            prefetch=arguments.radar_prefetch))
 
     if arguments.tend:
         t_end = arguments.tend
@@ -106,10 +137,13 @@ def main():
         t_end = subgrid.get_nd('tend')
     logger.info('End time (seconds): %r', t_end)
 
-    t = subgrid.get_nd('t1')  # by reference
-    while t < t_end:
-        apply_events(subgrid, scenario, rain_grid_container)
-        subgrid.update(-1)
-        t = subgrid.get_nd('t1')  # by reference
+    # events are applied before every step
+    apply_events(subgrid, scenario, rain_grid_container, radar_source)
+    stats = subgrid.run_until(
+        t_end,
+        callback=lambda subgrid: apply_events(
+            subgrid, scenario, rain_grid_container, radar_source))
+    logger.info('%(steps)d steps, %(mean).4fs per step', stats)
 
     clean_events(scenario, rain_grid_container)
+    radar_source.close()
@@ -2,9 +2,11 @@
 
 import collections
 import ctypes
+import json
 import logging
 import os
 import platform
+import pprint
 try:
     # py3
     import configparser
@@ -56,6 +58,17 @@ VARIABLE_TEMPLATE = """
 
 """
 
+VARIABLES_MODULE_TEMPLATE = '''"""
+Metadata of the fortran variables, generated from extractedvariables.json by
+python_subgrid.utils.generate_variables_module, do not edit.
+
+"""
+
+VARIABLES = [
+{variables}
+]
+'''
+
 
 OPTCRE = re.compile(
     r'(?P<option>[^:=\s][^:=]*)'          # very permissive!
@@ -206,6 +219,48 @@ def dlclose(lib):
         logging.debug('Closed')
 
 
+def _native(value):
+    """Return value with unicode strings converted to native strings"""
+    if isinstance(value, dict):
+        return {_native(key): _native(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_native(item) for item in value]
+    if not isinstance(value, (str, bytes)) and hasattr(value, 'encode'):
+        # unicode in python 2
+        return value.encode('utf-8')
+    return value
+
+
+def load_extracted_variables(path=None):
+    """Return the variables in extractedvariables.json, without the raw json
+    annotation (it's parsed into the other keys)"""
+    if path is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'extractedvariables.json')
+    with open(path) as f:
+        variables = _native(json.load(f)['variables'])
+    for variable in variables:
+        variable.pop('json', None)
+    return variables
+
+
+def generate_variables_module(path=None, target=None):
+    """Write the variables module, the precompiled contents of
+    extractedvariables.json. Parsing the json on every import of the wrapper
+    is slow. Run this after updating extractedvariables.json."""
+    if target is None:
+        target = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'variables.py')
+    variables = load_extracted_variables(path)
+    items = []
+    for variable in variables:
+        item = pprint.pformat(variable, width=75)
+        items.append('    ' + item.replace('\n', '\n    ') + ',')
+    with open(target, 'w') as f:
+        f.write(VARIABLES_MODULE_TEMPLATE.format(variables='\n'.join(items)))
+    print("Wrote %s variables to %s" % (len(variables), target))
+
+
 def generate_tables():
     """generate new tables"""
     import argparse
@@ -0,0 +1,1289 @@
+"""
+Metadata of the fortran variables, generated from extractedvariables.json by
+python_subgrid.utils.generate_variables_module, do not edit.
+
+"""
+
+VARIABLES = [
+    {'altname': None,
+     'description': 'diagonal coefficients of continuity  after the '
+                    'elimination of the velocities',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'aii',
+     'rank': 1,
+     'slice': '0:nodall',
+     'state': False,
+     'type': 'double',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'outer diagonal matrix coefficients of continuity  after '
+                    'the elimination of the velocities',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'aijl',
+     'rank': 1,
+     'slice': '1:lintot',
+     'state': False,
+     'type': 'double',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'constant matrix coefficients of continuity  after the '
+                    'elimination of the velocities',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'bi',
+     'rank': 1,
+     'slice': '0:nodall',
+     'state': False,
+     'type': 'double',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'waterlevel at previous timestep',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 's0',
+     'rank': 1,
+     'slice': '1:nodall',
+     'standard_name': 'sea_surface_height',
+     'state': True,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'waterlevel at current timestep',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 's1',
+     'rank': 1,
+     'slice': '1:nodall',
+     'standard_name': 'sea_surface_height',
+     'state': True,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'waterlevel at next timestep',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 's2',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'velocity at previous timestep',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'u0',
+     'rank': 1,
+     'slice': '1:linall',
+     'standard_name': 'sea_water_speed',
+     'state': True,
+     'type': 'double',
+     'unit': 'm/s'},
+    {'altname': None,
+     'description': 'velocity at current timestep',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'u1',
+     'rank': 1,
+     'slice': '1:linall',
+     'standard_name': 'sea_water_speed',
+     'state': True,
+     'type': 'double',
+     'unit': 'm/s'},
+    {'altname': None,
+     'description': 'velocity at next timestep',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'u2',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm/s'},
+    {'altname': None,
+     'description': 'advection',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'ade',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm2/s2'},
+    {'altname': None,
+     'description': 'advection',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'adi',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm2/s2'},
+    {'altname': None,
+     'description': 'velocity norm in cell centres',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'vnorm',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm/s'},
+    {'altname': None,
+     'description': 'velocities in cell centres, uc(:,1) = x velocities for '
+                    'all nodes, uc(:,2) = y velocities for all nodes',
+     'dimension': '(:,:)',
+     'fortrantype': 'double precision',
+     'name': 'uc',
+     'rank': 2,
+     'type': 'double',
+     'unit': 'm/s'},
+    {'altname': None,
+     'description': 'discharge on flow link',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'q',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm3/s'},
+    {'altname': None,
+     'description': 'discharge on first half of 2d flow link, this only '
+                    'contains values for 2d flow links',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'qh1',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm3/s'},
+    {'altname': None,
+     'description': 'discharge on second half of 2d flow link, this only '
+                    'contains values for 2d flow links',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'qh2',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm3/s'},
+    {'altname': None,
+     'description': 'volume in coarse grid cell on previous timestep',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'vol0',
+     'rank': 1,
+     'slice': '1:nodall',
+     'standard_name': 'sea_water_volume',
+     'state': False,
+     'type': 'double',
+     'unit': 'm3'},
+    {'altname': None,
+     'description': 'volume in coarse grid cell on current timestep',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'vol1',
+     'rank': 1,
+     'slice': '1:nodall',
+     'standard_name': 'sea_water_volume',
+     'state': False,
+     'type': 'double',
+     'unit': 'm3'},
+    {'altname': None,
+     'description': 'volume in coarse grid cell on previous timestep + '
+                    '(incoming discharges - outgoing discharges) * dt',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'vol2',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm3'},
+    {'altname': None,
+     'description': 'wet surface area of coarse grid cell on current timestep',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'su',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm2'},
+    {'altname': None,
+     'description': 'wet surface area of coarse grid cell on previous '
+                    'timestep',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'su0',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm2'},
+    {'altname': None,
+     'description': 'Bathymetry value of highest pixel of a cell. (including '
+                    '1d channels)',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'dmin',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'Bathymetry value of lowest pixel of a cell (including 1d '
+                    'channels)',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'dmax',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'space varying Manning coefficient (or chezy?!)',
+     'dimension': '(:,:)',
+     'fortrantype': 'real',
+     'name': 'cf',
+     'rank': 2,
+     'type': 'float',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'gridsize for all coarse quadtree levels 1:kmax',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'dx',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': 'FlowLink',
+     'description': 'Flow links/lines between coarse grid cells: line(L,1) = '
+                    'nod1, line(L,2) = nod2',
+     'dimension': '(:,:)',
+     'fortrantype': 'integer',
+     'name': 'line',
+     'rank': 2,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'inverse indirect adressing of coarse grid cells: nod = '
+                    'ls(k)$mn(m,n) --> m = nodm(nod)',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'nodm',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'inverse indirect adressing of coarse grid cells: nod = '
+                    'ls(k)$mn(m,n) --> n = nodn(nod)',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'nodn',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'inverse indirect adressing of coarse grid cells: nod = '
+                    'ls(k)$mn(m,n) --> k = nodk(nod)',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'nodk',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': 'FlowElem_xcc',
+     'description': 'Cell center x coordinate (pressure point) for all '
+                    'quadtree cells (i.e. nodes).',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'xz',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': 'FlowElem_ycc',
+     'description': 'Cell center y coordinate (pressure point) for all '
+                    'quadtree cells (i.e. nodes).',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'yz',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': 'FlowLink_xu',
+     'description': 'Velocity x coordinate for 1d, 2d, including boundaries',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'xu',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': 'FlowLink_yu',
+     'description': 'Velocity y coordinate for 1d, 2d, including boundaries',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'yu',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': 'FlowElemContour_x',
+     'description': 'List of x points forming flow element',
+     'dimension': '(:,:)',
+     'fortrantype': 'double precision',
+     'name': 'xbnd',
+     'rank': 2,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': 'FlowElemContour_y',
+     'description': 'List of y points forming flow element',
+     'dimension': '(:,:)',
+     'fortrantype': 'double precision',
+     'name': 'ybnd',
+     'rank': 2,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'Type of link',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'link_type',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'Index in the u vector',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'link_idx',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'Original link number',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'link_branchid',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'Distance along the branch',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'link_chainage',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'Type of node',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'nod_type',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'subgrid pixel numbers in coarse grid cells, see '
+                    'subroutine couplegrids(). E.g., '
+                    'ip(1:kmax,1:mmax(k),0:3).',
+     'dimension': '(:,:,:)',
+     'fortrantype': 'integer',
+     'name': 'ip',
+     'rank': 3,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'subgrid pixel numbers in coarse grid cells, see '
+                    'subroutine couplegrids(). E.g., '
+                    'ip(1:kmax,1:mmax(k),0:3).',
+     'dimension': '(:,:,:)',
+     'fortrantype': 'integer',
+     'name': 'jp',
+     'rank': 3,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'number of pixels in a quad tree cell of refinement k '
+                    '(1:kmax)',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'imaxk',
+     'rank': 1,
+     'type': 'int',
+     'unit': 'pixel'},
+    {'altname': None,
+     'description': 'number of pixels in a quad tree cell of refinement k '
+                    '(1:kmax)',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'jmaxk',
+     'rank': 1,
+     'type': 'int',
+     'unit': 'pixel'},
+    {'altname': None,
+     'description': 'quadtree grid administration',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'mmax',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'quadtree grid administration',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'nmax',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'coordinates of North boundaries',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'nbndry',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'coordinates of East boundaries',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'mbndry',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'administration of wet or dry velocity points (wet=1, '
+                    'dry=0)',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'kf',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'administration of wet or dry coarse grid cells (wet=1, '
+                    'dry=0)',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'ks',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': "qualification of flow link: 1D and/or 2D 'standard' flow "
+                    'links, see below. Or structure types.',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'kcu',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'number of u velocity points',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'liutot',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'number of v velocity points',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'livtot',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': 'nFlowElem2d',
+     'description': 'number of 2d nodes',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'n2dtot',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': 'nFlowElem2dBounds',
+     'description': 'number of nodal points  2d boundary points',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'n2dobc',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'nodal point numbers at levee begin',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'levnd0',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'nodal point numbers at levee end',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'levnd1',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'coordinates nodes of levee',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'xlevnd',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'coordinates nodes of levee',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'ylevnd',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'x coordinates of levee crest centers',
+     'dimension': '(:,:)',
+     'fortrantype': 'double precision',
+     'name': 'xlevc',
+     'rank': 2,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'y coordinates of levee crest centers',
+     'dimension': '(:,:)',
+     'fortrantype': 'double precision',
+     'name': 'ylevc',
+     'rank': 2,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'coordinates of levee extents',
+     'dimension': '(:,:)',
+     'fortrantype': 'double precision',
+     'name': 'xleve',
+     'rank': 2,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'coordinates of levee extents',
+     'dimension': '(:,:)',
+     'fortrantype': 'double precision',
+     'name': 'yleve',
+     'rank': 2,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'levee height',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'dlev',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'maps levee pieces to links',
+     'dimension': '(:,:)',
+     'fortrantype': 'integer',
+     'name': 'pce2lin',
+     'rank': 2,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'table containing levee breach numbers for flowlinks. '
+                    'These breach numbers refer to the elements of klb(:).',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'lin2lbr',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'highest crest level on link (positive down)',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'dlevminu',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'lowest crest level on link (positive down)',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'dlevmaxu',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'Quadtree refinement level for each pixel (kmax=coarsest, '
+                    '1=finest)',
+     'dimension': '(:,:)',
+     'fortrantype': 'integer',
+     'name': 'lg',
+     'rank': 2,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'Quadtree node number to which each pixel belongs.',
+     'dimension': '(:,:)',
+     'fortrantype': 'integer',
+     'name': 'lh',
+     'rank': 2,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'number of pixels in x directions',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'imax',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'number of pixels in y directions',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'jmax',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'pixel dimensions',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'dxp',
+     'rank': 0,
+     'type': 'double',
+     'unit': 'm/pixel'},
+    {'altname': None,
+     'description': 'pixel dimensions',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'dyp',
+     'rank': 0,
+     'type': 'double',
+     'unit': 'm/pixel'},
+    {'altname': None,
+     'description': 'origin of pixel grid',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'x0p',
+     'rank': 0,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'origin of pixel grid',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'y0p',
+     'rank': 0,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'origin of pixel grid',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'x1p',
+     'rank': 0,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'origin of pixel grid',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'y1p',
+     'rank': 0,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'Dummy missing value for bathymetry pixels, single '
+                    'precision.',
+     'dimension': '',
+     'fortrantype': 'real',
+     'name': 'dsnop',
+     'rank': 0,
+     'type': 'float',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'bathymetry pixel values on fine base grid',
+     'dimension': '(:,:)',
+     'fortrantype': 'real',
+     'name': 'dps',
+     'rank': 2,
+     'type': 'float',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'Projection information in Well Known Text fo4096',
+     'dimension': '(MAXSTRINGLEN)',
+     'fortrantype': 'character',
+     'name': 'wkt',
+     'rank': 1,
+     'type': 'char',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'max thickness of interception layer on fine base grid',
+     'dimension': '(:,:)',
+     'fortrantype': 'real',
+     'name': 'maxinterception',
+     'rank': 2,
+     'type': 'float',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'current level in interception layer per node',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'si',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'current level in interception layer per node at previous '
+                    'timestep',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'si0',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'keep/discard pixel based infiltration file',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'keep_infiltration',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'Maximum infiltration rate values on fine base grid',
+     'dimension': '(:,:)',
+     'fortrantype': 'real',
+     'name': 'infiltrationrate',
+     'rank': 2,
+     'type': 'float',
+     'unit': 'mm/d'},
+    {'altname': None,
+     'description': 'rainfall',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'rain',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm/s'},
+    {'altname': None,
+     'description': 'rainfall',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'qrain',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'TODO'},
+    {'altname': None,
+     'description': 'ground water level measured from "ground level" upwards '
+                    '(time dependent).',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'sg',
+     'rank': 1,
+     'slice': '1:n2dtot',
+     'standard_name': 'ground_water_level',
+     'state': 'true',
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'percentage of a crop per node',
+     'dimension': '(:,:)',
+     'fortrantype': 'double precision',
+     'name': 'LandUse',
+     'rank': 2,
+     'type': 'double',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'soil types on fine grid',
+     'dimension': '(:,:)',
+     'fortrantype': 'integer',
+     'name': 'soiltype',
+     'rank': 2,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'root lengths on fine grid',
+     'dimension': '(:,:)',
+     'fortrantype': 'integer',
+     'name': 'rootlength',
+     'rank': 2,
+     'type': 'int',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'crop factors on fine grid',
+     'dimension': '(:,:)',
+     'fortrantype': 'integer',
+     'name': 'croptype',
+     'rank': 2,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'Relative volume of UZ moisture contained in a ground '
+                    'cell, first dimension relates to layers. Value between 0 '
+                    'and 1.',
+     'dimension': '(:,:)',
+     'fortrantype': 'double precision',
+     'name': 'wvol',
+     'rank': 2,
+     'slice': '1,1:n2dtot',
+     'standard_name': 'soil_moisture_content',
+     'type': 'double',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'Position of ground layer(s), measured from "ground '
+                    'level" upwards.',
+     'dimension': '(:,:)',
+     'fortrantype': 'double precision',
+     'name': 'zg',
+     'rank': 2,
+     'slice': '1,1:n2dtot',
+     'standard_name': 'bedrock_altitude',
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'Seepage from deeper aquifer into groundwater volume on '
+                    'quadtree grid, read in as mm/day.',
+     'dimension': '(:)',
+     'fortrantype': 'double precision',
+     'name': 'qseep',
+     'rank': 1,
+     'type': 'double',
+     'unit': 'm3/s'},
+    {'altname': None,
+     'description': 'Constant (spatially uniform) seepage, read in as mm/day. '
+                    'If set, replaces spatially varying qseep.',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'qseep_const',
+     'rank': 0,
+     'type': 'double',
+     'unit': 'm/s'},
+    {'altname': None,
+     'description': 'Auto-set if qseep_const is specified in input. If set, '
+                    'replaces spatially varying qseep.',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'seep_const',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'number of the current timestep',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'nt',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'maximum number of timesteps in the simulation',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'ntmax',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'counter of iteration in non-linear continuity equation '
+                    'loop',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'jai',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'number of times that dt has been halved in timestep '
+                    'control loop (1 = original dt, 2 = dt halved once, 3 = '
+                    'dt halved twice, 4 = dt halved thrice)',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'idthalf',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'delta t',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'dt',
+     'rank': 0,
+     'type': 'double',
+     'unit': 's'},
+    {'altname': None,
+     'description': 'maximum delta t',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'dtmax',
+     'rank': 0,
+     'type': 'double',
+     'unit': 's'},
+    {'altname': None,
+     'description': 'minumum delta t',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'dtmin',
+     'rank': 0,
+     'type': 'double',
+     'unit': 's'},
+    {'altname': None,
+     'description': 'time at previous timestep (0 means midnight before or at '
+                    'start datetime).',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 't0',
+     'rank': 0,
+     'type': 'double',
+     'unit': 's'},
+    {'altname': None,
+     'description': 'time at current timestep (0 means midnight before or at '
+                    'start datetime).',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 't1',
+     'rank': 0,
+     'type': 'double',
+     'unit': 's'},
+    {'altname': None,
+     'description': 'start time of simulation (0 means midnight before or at '
+                    'start datetime).',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'tstart',
+     'rank': 0,
+     'type': 'double',
+     'unit': 's'},
+    {'altname': None,
+     'description': 'stop time of simulation (0 means midnight before or at '
+                    'start datetime).',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'tend',
+     'rank': 0,
+     'type': 'double',
+     'unit': 's'},
+    {'altname': None,
+     'description': 'Friction coefficient, (Chezy or Manning, see FrictType )',
+     'dimension': '',
+     'fortrantype': 'double precision',
+     'name': 'frictcoefuser',
+     'rank': 0,
+     'type': 'double',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'constant/space varying friction coefficient',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'const_friction',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'friction type (1: Chezy, 4: Manning)',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'fricttype',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'temporary adminstration of gridcells (nodes) affected by '
+                    'user run-time edits (for updating tables)',
+     'dimension': '(:)',
+     'fortrantype': 'logical',
+     'name': 'editmask',
+     'rank': 1,
+     'type': 'bool',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'print log to stdout silent or normal verbose',
+     'dimension': '',
+     'fortrantype': 'logical',
+     'name': 'printToStdout',
+     'rank': 0,
+     'type': 'bool',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'extra verbose (e.g. print timers for profiling)',
+     'dimension': '',
+     'fortrantype': 'logical',
+     'name': 'verbose',
+     'rank': 0,
+     'type': 'bool',
+     'unit': '-'},
+    {'altname': None,
+     'description': 'gridsize in 1d channels',
+     'dimension': '(:,:)',
+     'fortrantype': 'double precision',
+     'name': 'ds1d',
+     'rank': 2,
+     'type': 'double',
+     'unit': 'm'},
+    {'altname': None,
+     'description': 'number of u points per channel (for embedded: nr of 2D '
+                    'cell interfaces crossed by 1D channel)',
+     'dimension': '(:)',
+     'fortrantype': 'integer',
+     'name': 'lu1dmx',
+     'rank': 1,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': 'nFlowElem1dBounds',
+     'description': 'number of  1d boundary points',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'n1dobc',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'altname': 'nFlowElem1d',
+     'description': 'total number of nodal points in 1d without boundary '
+                    'points',
+     'dimension': '',
+     'fortrantype': 'integer',
+     'name': 'n1dtot',
+     'rank': 0,
+     'type': 'int',
+     'unit': '-'},
+    {'description': 'Weir',
+     'fields': [{'internal': 'structure%id',
+                 'name': 'id',
+                 'shape': ['MAXSTRINGLEN'],
+                 'type': 'char'},
+                {'internal': 'structure%x',
+                 'name': 'x',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'structure%y',
+                 'name': 'y',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'structure%ibran',
+                 'name': 'branchid',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'structure%distance',
+                 'name': 'chainage',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'structure%left_calc_point',
+                 'name': 'left_calc_point',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'structure%right_calc_point',
+                 'name': 'right_calc_point',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'structure%link_number',
+                 'name': 'link_number',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'fortranweir%crestlevel',
+                 'name': 'crest_level',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranweir%crestwidth',
+                 'name': 'crest_width',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranweir%dischargecoeff',
+                 'name': 'discharge_coeff',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranweir%latdiscoeff',
+                 'name': 'lat_dis_coeff',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranweir%allowedflowdir',
+                 'name': 'allowed_flow_dir',
+                 'shape': [],
+                 'type': 'int'}],
+     'id': 2,
+     'name': 'weirs',
+     'type': 'weir'},
+    {'description': 'Orifice',
+     'fields': [{'internal': 'structure%id',
+                 'name': 'id',
+                 'shape': ['MAXSTRINGLEN'],
+                 'type': 'char'},
+                {'internal': 'structure%x',
+                 'name': 'x',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'structure%y',
+                 'name': 'y',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'structure%ibran',
+                 'name': 'branchid',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'structure%distance',
+                 'name': 'chainage',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'structure%left_calc_point',
+                 'name': 'left_calc_point',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'structure%right_calc_point',
+                 'name': 'right_calc_point',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'structure%link_number',
+                 'name': 'link_number',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'fortranorifice%crestlevel',
+                 'name': 'crest_level',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranorifice%crestwidth',
+                 'name': 'crest_width',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranorifice%openlevel',
+                 'name': 'open_level',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranorifice%contrcoeff',
+                 'name': 'contraction_coeff',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranorifice%latcontrcoeff',
+                 'name': 'lat_contr_coeff',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranorifice%allowedflowdir',
+                 'name': 'allowed_flow_dir',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranorifice%limitflowpos',
+                 'name': 'limit_flow_pos',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranorifice%limitflowneg',
+                 'name': 'limit_flow_neg',
+                 'shape': [],
+                 'type': 'double'}],
+     'id': 2,
+     'name': 'orifices',
+     'type': 'orifice'},
+    {'description': 'Pump',
+     'fields': [{'internal': 'structure%id',
+                 'name': 'id',
+                 'shape': ['MAXSTRINGLEN'],
+                 'type': 'char'},
+                {'internal': 'structure%x',
+                 'name': 'x',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'structure%y',
+                 'name': 'y',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'structure%ibran',
+                 'name': 'branchid',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'structure%distance',
+                 'name': 'chainage',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'structure%left_calc_point',
+                 'name': 'left_calc_point',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'structure%right_calc_point',
+                 'name': 'right_calc_point',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'structure%link_number',
+                 'name': 'link_number',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'fortranpump%ss_onlevel(1)',
+                 'name': 'start_level_suction_side',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranpump%ss_offlevel(1)',
+                 'name': 'stop_level_suction_side',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranpump%capacity(1)',
+                 'name': 'capacity',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranpump%oldcapacity',
+                 'name': 'oldcapacity',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranpump%reduction_factor',
+                 'name': 'reduction_factor',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranpump%actual_stage',
+                 'name': 'actual_stage',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'fortranpump%is_active',
+                 'name': 'is_active',
+                 'shape': [],
+                 'type': 'bool'}],
+     'id': 4,
+     'name': 'pumps',
+     'type': 'pump'},
+    {'description': 'Culvert',
+     'fields': [{'internal': 'structure%id',
+                 'name': 'id',
+                 'shape': ['MAXSTRINGLEN'],
+                 'type': 'char'},
+                {'internal': 'structure%x',
+                 'name': 'x',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'structure%y',
+                 'name': 'y',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'structure%ibran',
+                 'name': 'branchid',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'structure%distance',
+                 'name': 'chainage',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'structure%left_calc_point',
+                 'name': 'left_calc_point',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'structure%right_calc_point',
+                 'name': 'right_calc_point',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'structure%link_number',
+                 'name': 'link_number',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'fortranculvert%leftlevel',
+                 'name': 'left_level',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranculvert%rightlevel',
+                 'name': 'right_level',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranculvert%allowedflowdir',
+                 'name': 'allowed_flow_dir',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'fortranculvert%crosssectionnr',
+                 'name': 'crosssection_id',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'fortranculvert%length',
+                 'name': 'length',
+                 'shape': [],
+                 'type': 'double'},
+                {'internal': 'fortranculvert%valve_onoff',
+                 'name': 'valve_inuse',
+                 'shape': [],
+                 'type': 'int'},
+                {'internal': 'fortranculvert%inivalveopen',
+                 'name': 'valve_opening',
+                 'shape': [],
+                 'type': 'double'}],
+     'id': 21,
+     'name': 'culverts',
+     'type': 'culvert'},
+]
@@ -4,27 +4,34 @@ This module provides a ctypes wrapper around the fortran 'subgrid' library.
 """
 
 from __future__ import print_function
+import collections
 import functools
 import io
 import logging
+import numbers
 import os
-import multiprocessing          # for shared memory
 import platform
 import inspect
-import json
 import sys
+import threading
+import timeit
+import weakref
 
 from numpy.ctypeslib import ndpointer  # nd arrays
 import numpy as np
-import pandas
-import faulthandler
+
+from python_subgrid.instrumentation import Instrumentation
+from python_subgrid.instrumentation import INSTRUMENTED_METHODS
+from python_subgrid.sharedmem import SharedArray
+from python_subgrid.snapshots import Snapshot, SnapshotStore
+from python_subgrid.variables import VARIABLES
 
 
 from ctypes import (
     # Types
-    c_double, c_int, c_char_p, c_bool, c_char, c_float,
+    c_double, c_int, c_char_p, c_bool, c_char, c_float, c_void_p,
     # Complex types
-    ARRAY, Structure,
+    ARRAY, Structure, sizeof,
     # Making strings
     # Pointering
     POINTER, byref, CFUNCTYPE,
@@ -58,14 +65,19 @@ def create_string_buffer(init, size=None):
     raise TypeError(init)
 
 
-try:
-    faulthandler.enable()
-except io.UnsupportedOperation:
-    # In notebooks faulthandler does not work.
-    pass
-except AttributeError:
-    # In notebooks faulthandler does not work.
-    pass
+def enable_faulthandler():
+    """Dump the python traceback when the fortran library crashes"""
+    import faulthandler
+    if faulthandler.is_enabled():
+        return
+    try:
+        faulthandler.enable()
+    except io.UnsupportedOperation:
+        # In notebooks faulthandler does not work.
+        pass
+    except AttributeError:
+        # In notebooks faulthandler does not work.
+        pass
 
 
 class NotDocumentedError(Exception):
@@ -117,7 +129,6 @@ LEVELS_F2PY = dict(zip(LEVELS_PY2F.values(), LEVELS_PY2F.keys()))
 
 
 logger = logging.getLogger(__name__)
-logging.basicConfig()
 logger.setLevel(logging.DEBUG)
 
 
@@ -140,31 +151,127 @@ progresslogger.addHandler(logging.NullHandler())
 
 
 # always pass the same progress stack
-def fortran_progress(message, progress_p, progressstack=[]):
-    """python progress to be called from fortran"""
-    progress = progress_p.contents.value
+def handle_progress(message, progress, progressstack=[]):
+    """Log progress of message, 0.0 is the start and -1 the end"""
     # push the message in the progress message stack.
     if progress == 0.0:
         progressstack.append(message)
-        progresslogger.info('Progress started on {}'.format(message))
+        progresslogger.info('Progress started on %s', message)
     elif progress == -1:
         # done with monitoring progress of current message, pop it out
         if not progressstack:
-            logger.warn("Progress stopped but no current progress message")
+            logger.warning("Progress stopped but no current progress message")
             return
         message = progressstack.pop()
-        progresslogger.info('Progress stopped on {}'.format(message))
+        progresslogger.info('Progress stopped on %s', message)
         return
     elif not progressstack:
-        logger.warn("Progress reported but no current progress message")
+        logger.warning("Progress reported but no current progress message")
         # this should not happen
         return
-    progresslogger.debug("{} {}".format(progressstack[-1], progress))
+    if progresslogger.isEnabledFor(logging.DEBUG):
+        progresslogger.debug("%s %s", progressstack[-1], progress)
+
+
+def fortran_progress(message, progress_p):
+    """python progress to be called from fortran"""
+    handle_progress(message, progress_p.contents.value)
 
 fortran_progress_functype = CFUNCTYPE(None, c_char_p, POINTER(c_double))
 fortran_progress_func = fortran_progress_functype(fortran_progress)
 
 
+class CallbackBuffer(object):
+    """Buffer for log and progress messages from fortran.
+
+    The fortran callbacks only copy the message into a ring buffer of
+    ``maxlen`` messages, they are logged when the buffer is drained. The
+    wrapper drains it after every update or, with ``thread=True``, a
+    background thread drains it every ``drain_interval`` seconds.
+
+    Log messages below the level of the logger are skipped right away.
+    Progress updates are coalesced to one every ``progress_interval``
+    seconds, start and stop are always passed. If fortran logs faster than
+    we drain, the oldest messages are dropped, ``dropped`` counts them.
+    """
+
+    def __init__(self, maxlen=10000, progress_interval=1.0,
+                 drain_interval=0.1):
+        self.messages = collections.deque(maxlen=maxlen)
+        self.progress_interval = progress_interval
+        self.drain_interval = drain_interval
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_progress = None
+        self.timer = timeit.default_timer
+        self.thread = None
+        self.stopping = threading.Event()
+        # keep references to the callbacks, fortran holds a pointer to them
+        self.log_func = fortran_log_functype(self.log)
+        self.progress_func = fortran_progress_functype(self.progress)
+
+    def _append(self, item):
+        if len(self.messages) == self.messages.maxlen:
+            self.dropped += 1
+        self.messages.append(item)
+
+    def log(self, f_level, message):
+        """log callback, to be called from fortran"""
+        level = LEVELS_F2PY[f_level]
+        if logger.isEnabledFor(level):
+            self._append((level, message))
+
+    def progress(self, message, progress_p):
+        """progress callback, to be called from fortran"""
+        progress = progress_p.contents.value
+        if progress != 0.0 and progress != -1:
+            now = self.timer()
+            last = self.last_progress
+            if last is not None and now - last < self.progress_interval:
+                self.coalesced += 1
+                return
+            self.last_progress = now
+        self._append((None, (message, progress)))
+
+    def drain(self):
+        """Log all buffered messages, return the number of messages"""
+        messages = self.messages
+        n = 0
+        while True:
+            try:
+                level, message = messages.popleft()
+            except IndexError:
+                break
+            if level is None:
+                handle_progress(*message)
+            else:
+                logger.log(level, message)
+            n += 1
+        return n
+
+    def _run(self):
+        while not self.stopping.wait(self.drain_interval):
+            self.drain()
+
+    def start_thread(self):
+        """Drain the buffer in a background thread"""
+        if self.thread is not None:
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run,
+                                       name='subgrid-callbacks')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop_thread(self):
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+        self.drain()
+
+
 def struct2dict(struct):
     """convert a ctypes structure to a dictionary"""
     return {x: getattr(struct, x) for x in dict(struct._fields_).keys()}
@@ -186,6 +293,7 @@ def structs2records(structs):
 
 def structs2pandas(structs):
     """convert ctypes structure or structure array to pandas data frame"""
+    import pandas
     records = list(structs2records(structs))
     df = pandas.DataFrame.from_records(records)
     # TODO: do this for string columns, for now just for id
@@ -205,36 +313,45 @@ SHAPEARRAY = ndpointer(dtype='int32',
 # If you make changes in FUNCTIONS, run
 # 'bin/generate_functions_documentation' to re-generate the automatic
 # documentation in ./doc/source/fortran_functions.rst.
+# Functions marked with 'reallocates' can (re)allocate model variables. Cached
+# variable metadata is dropped after calling them. Functions marked with
+# 'timestep' advance the model, bound arrays are revalidated after them.
 FUNCTIONS = [
     {
         'name': 'update',
         'argtypes': [POINTER(c_double)],
         'restype': c_int,
+        'timestep': True,
     },
     {
         'name': 'startup',
         'argtypes': [],
         'restype': c_int,
+        'reallocates': True,
     },
     {
         'name': 'shutdown',
         'argtypes': [],
         'restype': c_int,
+        'reallocates': True,
     },
     {
         'name': 'loadmodel',
         'argtypes': [c_char_p],  # I think this is a pointer to a char_p
         'restype': c_int,
+        'reallocates': True,
     },
     {
         'name': 'initmodel',
         'argtypes': [],
         'restype': c_int,
+        'reallocates': True,
     },
     {
         'name': 'finalizemodel',
         'argtypes': [],
         'restype': c_int,
+        'reallocates': True,
     },
     {
         'name': 'changebathy',
@@ -257,6 +374,7 @@ FUNCTIONS = [
             POINTER(c_double)   # y1
         ],
         'restype': c_int,
+        'reallocates': True,
     },
     {
         'name': 'floodfilling',
@@ -274,17 +392,20 @@ FUNCTIONS = [
                      POINTER(c_int),      # itype
                      POINTER(c_double)],  # value
         'restype': c_int,
+        'reallocates': True,
     },
     {
         'name': 'discard_manhole',
         'argtypes': [POINTER(c_double),
                      POINTER(c_double)],
         'restype': c_int,
+        'reallocates': True,
     },
     {
         'name': 'discard_structure',
         'argtypes': [c_char_p],
         'restype': c_int,
+        'reallocates': True,
     },
     {
         'name': 'dropinstantrain',
@@ -310,6 +431,7 @@ FUNCTIONS = [
         'name': 'read_restart',
         'argtypes': [c_char_p],
         'restype': c_int,
+        'reallocates': True,
     },
     {
         'name': 'write_restart',
@@ -339,41 +461,538 @@ try:
 except NameError:
     WRAPPERFILE = os.path.abspath(inspect.getsourcefile(lambda: None))
 WRAPPERDIR = os.path.dirname(WRAPPERFILE)
-with open(os.path.join(WRAPPERDIR, 'extractedvariables.json')) as f:
-    JSONVARIABLES = json.load(f)
+
+
+VariableSpec = collections.namedtuple(
+    'VariableSpec',
+    ['name', 'description', 'unit', 'state', 'type_', 'dtype', 'rank',
+     'section']
+)
+
+# symbolic bounds of the sections in the catalogue, as the sum of scalars
+SYMBOLS = {
+    'n2dtot': ['nFlowElem2d'],
+    'nodall': ['nFlowElem2d', 'nFlowElem2dBounds',
+               'nFlowElem1d', 'nFlowElem1dBounds'],
+    # the 2d links, u links first
+    'lintot': ['liutot', 'livtot'],
+}
+# symbolic bounds without a scalar in the library, as the extent of a
+# dimension of an array: all links (1d, 2d and boundaries) are the rows of
+# line(1:linall, 2)
+EXTENT_SYMBOLS = {
+    'linall': ('FlowLink', 0),
+}
+
+
+def _bound(text):
+    """Return a bound of a fortran section as int, symbol or None"""
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def parse_section(text):
+    """Parse a fortran array section like ``1,1:n2dtot``.
+
+    Return a tuple with per dimension an index or a (start, stop) tuple.
+    The bounds are ints, symbols (strings) or None.
+    """
+    if not text:
+        return None
+    section = []
+    for dimension in text.split(','):
+        bounds = [_bound(bound) for bound in dimension.split(':')]
+        if len(bounds) == 1:
+            section.append(bounds[0])
+        else:
+            section.append(tuple(bounds))
+    return tuple(section)
+
+
+def section2index(section, shape, symbols):
+    """Return the numpy index of a fortran section on an array of shape.
+
+    Symbols are looked up in ``symbols``. If a section ends at the upper
+    bound of the array, the elements before its start are dropped. For
+    example ``1:nodall`` on ``s1(0:nodall)`` drops element 0. If the upper
+    bound is unknown or the section ends before the end of the array, the
+    array is assumed to start at 0 (the dummy element convention of
+    subgrid), so ``1:lintot`` on ``aijl(0:linall)`` drops element 0 and the
+    elements after lintot. Indices are 1 based. Return None if the section
+    does not fit the array.
+    """
+    if section is None or len(section) != len(shape):
+        return None
+    index = []
+    for dimension, n in zip(section, [int(n) for n in shape]):
+        if isinstance(dimension, tuple):
+            start, stop = [symbols.get(bound) if isinstance(bound, str)
+                           else bound for bound in dimension]
+            lower = 0 if stop is None else stop - n + 1
+            end = n
+            if lower < 0:
+                # ends before the upper bound of the array
+                lower, end = 0, stop + 1
+            if lower not in (0, 1):
+                return None
+            if start is None:
+                start = lower
+            if not lower <= start < lower + end:
+                return None
+            index.append(slice(start - lower, end))
+        else:
+            if isinstance(dimension, str):
+                dimension = symbols.get(dimension)
+            if dimension is None or not 1 <= dimension <= n:
+                return None
+            index.append(dimension - 1)
+    return tuple(index)
+
+
+def variable_spec(variable):
+    """Return the :class:`VariableSpec` of an entry in the variables module"""
+    name = str(variable.get('altname') or variable['name'])
+    type_ = variable.get('type')
+    if type_ is not None:
+        # like the types of the library
+        type_ = type_.encode('ascii')
+    return VariableSpec(
+        name=name,
+        description=variable['description'],
+        unit=variable.get('unit'),
+        state=variable.get('state') in (True, 'true'),
+        type_=type_,
+        dtype=TYPEMAP.get(type_),
+        rank=variable.get('rank'),
+        section=parse_section(variable.get('slice'))
+    )
+
+
+# generated from extractedvariables.json, see utils.generate_variables_module
+CATALOGUE = {spec.name: spec for spec in map(variable_spec, VARIABLES)}
 DOCUMENTED_VARIABLES = {
-    bytes(variable.get('altname') or variable['name']): variable['description']
-    for variable
-    in JSONVARIABLES['variables']
+    name: spec.description for name, spec in CATALOGUE.items()
 }
 
+# variables flagged as state, captured by snapshots together with the time
+STATE_VARIABLES = sorted(
+    name for name, spec in CATALOGUE.items() if spec.state
+)
+TIME_VARIABLES = ['t0', 't1', 'dt', 'nt']
+
+
+# structure fields of these types can be written directly in fortran memory
+DIRECT_CTYPES = {c_bool, c_double, c_float, c_int}
+
+# get_many(copy=True) copies into buffers, one per list of names.
+MAX_ARENAS = 16
+ARENA_ALIGNMENT = 64
+
+# string arguments of the wrapped functions are encoded once, per function.
+MAX_STRING_BUFFERS = 256
 
 # the following variables need to be copied explicitly because they are not
 # kept in memory implement through introspection??
-NEED_COPYING = {b'link_branchid', b'link_chainage', b'link_idx', b'link_type'
-                b'nod_branchid', b'nod_chainage', b'nod_idx', b'node_type'}
+NEED_COPYING = {'link_branchid', 'link_chainage', 'link_idx', 'link_type'
+                'nod_branchid', 'nod_chainage', 'nod_idx', 'node_type'}
 
 # Add variables here that are indexed 0 based or n+1 based in fortran and where
 # the extra dimension should not be returned
 # Not used by default yet. (Use sliced=True in get_nd)
-# These should match with the info in extracted_variables.json
+# Only for variables without a section in the CATALOGUE, the others are
+# sliced by their section.
 SLICES = {
-    b'u1': np.s_[1:],
-    b'FlowElem_xcc': np.s_[1:],
-    b'FlowElem_ycc': np.s_[1:],
-    b'nod_type': np.s_[1:],
-    b's1': np.s_[1:],
-    b'vol1': np.s_[1:],
-    b'dps': np.s_[1:-1, 1:-1],
-    b'soiltype': np.s_[1:-1, 1:-1],
-    b'croptype': np.s_[1:-1, 1:-1],
-    b'infiltrationrate': np.s_[1:-1, 1:-1],
-    b'maxinterception': np.s_[1:-1, 1:-1],
-    b'uc': np.s_[:, 1:],
-    b'zg': np.s_[:, 0],  # First ground water layer
+    'FlowElem_xcc': np.s_[1:],
+    'FlowElem_ycc': np.s_[1:],
+    'nod_type': np.s_[1:],
+    'dps': np.s_[1:-1, 1:-1],
+    'soiltype': np.s_[1:-1, 1:-1],
+    'croptype': np.s_[1:-1, 1:-1],
+    'infiltrationrate': np.s_[1:-1, 1:-1],
+    'maxinterception': np.s_[1:-1, 1:-1],
+    'uc': np.s_[:, 1:],
 }
 
 
+def string_marshaller(strict=False):
+    """Return a function that converts strings to (cached) string buffers.
+
+    The buffers are only used as input, the fortran library does not change
+    them, so the same buffer can be passed for the same name.
+    """
+    buffers = {}
+
+    def marshal(arg):
+        try:
+            return buffers[arg]
+        except KeyError:
+            pass
+        if strict and not isinstance(arg, (str, bytes)):
+            raise TypeError("Expected a string, got {!r}".format(arg))
+        if len(buffers) >= MAX_STRING_BUFFERS:
+            buffers.clear()
+        buffer = buffers[arg] = create_string_buffer(arg)
+        return buffer
+    return marshal
+
+
+def pointer_marshaller(argtype, strict=False):
+    """Return a function that converts numbers to a pointer of argtype.
+
+    The value is stored in a preallocated cell, one per thread, the same
+    pointer is returned for every call in a thread. This is fine for the
+    fortran library, which copies the values.
+    """
+    local = threading.local()
+
+    def marshal(arg):
+        if strict and not isinstance(arg, numbers.Real):
+            raise TypeError("Expected a number, got {!r}".format(arg))
+        try:
+            cell, pointer = local.cell
+        except AttributeError:
+            cell = argtype._type_()
+            pointer = argtype(cell)
+            local.cell = cell, pointer
+        cell.value = arg
+        return pointer
+    return marshal
+
+
+VariableInfo = collections.namedtuple(
+    'VariableInfo',
+    ['name', 'c_name', 'rank', 'shape', 'type_', 'arraytype']
+)
+CompoundInfo = collections.namedtuple(
+    'CompoundInfo',
+    ['name', 'struct', 'dtype', 'fields']
+)
+
+
+def struct2dtype(struct):
+    """Return the numpy dtype with the same memory layout as a structure"""
+    names = []
+    formats = []
+    offsets = []
+    for fieldname, fieldctype in struct._fields_:
+        if getattr(fieldctype, '_type_', None) is c_char:
+            # character arrays are strings
+            format_ = 'S{}'.format(fieldctype._length_)
+        else:
+            format_ = np.dtype(fieldctype)
+        names.append(fieldname)
+        formats.append(format_)
+        offsets.append(getattr(struct, fieldname).offset)
+    return np.dtype({
+        'names': names,
+        'formats': formats,
+        'offsets': offsets,
+        'itemsize': sizeof(struct)
+    })
+
+
+def records2pandas(records):
+    """convert a (structured) record array to pandas data frame"""
+    import pandas
+    df = pandas.DataFrame.from_records(records)
+    if 'id' in df:
+        # fortran pads strings with spaces
+        df["id"] = df["id"].apply(lambda x: x.rstrip())
+    return df
+
+
+# Loaded and annotated libraries by (path, mtime), shared by all the wrappers
+# in this process. A rebuilt library (a new mtime) is loaded again.
+LIBRARY_CACHE = {}
+# resolved library path by (SUBGRID_PATH, working directory)
+LIBRARY_PATH_CACHE = {}
+library_lock = threading.Lock()
+
+
+def annotate_library(library):
+    """Set the argument and result types of the fortran functions"""
+    for function in FUNCTIONS:
+        api_function = getattr(library, function['name'])
+        api_function.argtypes = function['argtypes']
+        api_function.restype = function['restype']
+    # get_var returns a pointer to a different type for every variable.
+    # We pass a reference to the matching pointer type (see get_nd).
+    library.get_var.argtypes = [c_char_p, c_void_p]
+    library.get_var.restype = None
+    # The same for the value of set_structure_field, which depends on the
+    # field.
+    library.set_structure_field.argtypes = [
+        c_char_p, c_char_p, c_char_p, c_void_p]
+    library.set_structure_field.restype = None
+
+
+def load_library(path):
+    """Return the annotated library at path, it's loaded once per process"""
+    key = (path, os.path.getmtime(path))
+    with library_lock:
+        library = LIBRARY_CACHE.get(key)
+        if library is None:
+            logger.info("Loading library from path {}".format(path))
+            library = cdll.LoadLibrary(path)
+            annotate_library(library)
+            LIBRARY_CACHE[key] = library
+    return library
+
+
+def preload_library(path=None):
+    """Load the library before it's needed, return it.
+
+    Call this in the parent process before forking workers, or when a
+    worker process starts, so the model starts with the library already
+    mapped and annotated.
+    """
+    if path is None:
+        path = SubgridWrapper()._library_path()
+    return load_library(path)
+
+
+def unload_library(library):
+    """Forget library and close it (see :func:`utils.dlclose`). Wrappers
+    that are still using it will crash."""
+    from python_subgrid.utils import dlclose
+    with library_lock:
+        for key, cached in list(LIBRARY_CACHE.items()):
+            if cached is library:
+                del LIBRARY_CACHE[key]
+    dlclose(library)
+
+
+class MetadataRegistry(object):
+    """Per wrapper cache of variable metadata.
+
+    Looking up the rank, shape and type of a variable and creating the
+    matching pointer type takes several calls into the library. This only
+    changes when the library (re)allocates its variables, so the metadata is
+    looked up once per variable. The wrapper invalidates the registry after
+    calling one of the reallocating functions (see ``FUNCTIONS``).
+
+    The ``hits`` and ``misses`` counters show how often the cache was used.
+    The ``generation`` is increased on every invalidation.
+    """
+
+    def __init__(self, wrapper):
+        self.wrapper = wrapper
+        self.variables = {}
+        # compound types don't change, these are kept
+        self.compounds = {}
+        # other things derived from variables, dropped with the variables
+        self.derived = {}
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+
+    def __contains__(self, name):
+        return name in self.variables
+
+    def __getitem__(self, name):
+        """Return the :class:`VariableInfo` of variable ``name``"""
+        try:
+            info = self.variables[name]
+        except KeyError:
+            self.misses += 1
+            info = self.variables[name] = self.lookup(name)
+        else:
+            self.hits += 1
+        return info
+
+    def lookup(self, name):
+        """Look up the metadata of variable ``name`` in the library"""
+        wrapper = self.wrapper
+        # How many dimensions.
+        rank = wrapper.get_var_rank(name)
+        shape = wrapper.get_var_shape(name, rank=rank)
+        # variable type name
+        type_ = wrapper.get_var_type(name)
+        if type_ in TYPEMAP:
+            # Store the data in this type
+            arraytype = ndpointer(dtype=TYPEMAP[type_],
+                                  ndim=rank,
+                                  shape=shape,
+                                  flags='F')
+        else:
+            arraytype = wrapper.make_compound_ctype(name)
+        return VariableInfo(name=name,
+                            c_name=create_string_buffer(name),
+                            rank=rank,
+                            shape=shape,
+                            type_=type_,
+                            arraytype=arraytype)
+
+    def compound(self, compoundname):
+        """Return the :class:`CompoundInfo` of compound type compoundname"""
+        try:
+            return self.compounds[compoundname]
+        except KeyError:
+            struct = self.wrapper.make_compound_struct(compoundname)
+            info = self.compounds[compoundname] = CompoundInfo(
+                name=compoundname,
+                struct=struct,
+                dtype=struct2dtype(struct),
+                fields=dict(struct._fields_)
+            )
+            return info
+
+    def invalidate(self):
+        """Forget all metadata, variables may have been reallocated"""
+        if self.variables:
+            logger.debug("Invalidating metadata of %d variables",
+                         len(self.variables))
+        self.variables.clear()
+        self.derived.clear()
+        self.generation += 1
+
+
+class BoundArray(object):
+    """Long lived zero-copy view on a Fortran variable.
+
+    Get one with :meth:`SubgridWrapper.bind`. Instead of calling ``get_nd``
+    every timestep you can keep a reference to the bound array and use its
+    :attr:`array` (or pass it to numpy directly). After every ``update`` the
+    wrapper checks whether the variable still lives at the same address. If
+    Fortran reallocated it, the view is recreated.
+
+    """
+
+    def __init__(self, wrapper, name, sliced=False):
+        self.wrapper = wrapper
+        self.name = name
+        self.sliced = sliced
+        # the number of times we had to recreate the view
+        self.rebinds = 0
+        self.address = None
+        self.shape = None
+        self.generation = None
+        self._array = None
+        self.bind()
+
+    def bind(self):
+        """(Re)create the view on the current Fortran memory"""
+        wrapper = self.wrapper
+        info = wrapper.metadata[self.name]
+        if info.type_ not in TYPEMAP:
+            raise ValueError(
+                "Can't bind compound variable {}".format(self.name))
+        if self.name in NEED_COPYING or wrapper.sharedmem:
+            raise ValueError(
+                "Can't bind {}, it is always copied".format(self.name))
+        if self.address is not None:
+            logger.debug("Rebinding %s, memory was reallocated", self.name)
+            self.rebinds += 1
+        self.address = wrapper._get_address(info)
+        self.shape = info.shape
+        self.generation = wrapper.metadata.generation
+        self._array = wrapper.get_nd(self.name, sliced=self.sliced)
+
+    def validate(self):
+        """Rebind if the variable moved. Return True if it did."""
+        info = self.wrapper.metadata[self.name]
+        address = self.wrapper._get_address(info)
+        if address != self.address or info.shape != self.shape:
+            self.bind()
+            return True
+        self.generation = self.wrapper.metadata.generation
+        return False
+
+    @property
+    def array(self):
+        """Return the numpy view on the Fortran memory"""
+        if self.generation != self.wrapper.metadata.generation:
+            # a reallocating function was called since we last checked
+            self.validate()
+        return self._array
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.array
+        return self.array.astype(dtype)
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+    def __setitem__(self, index, value):
+        self.array[index] = value
+
+    def __repr__(self):
+        return "<BoundArray {} at 0x{:x} ({} rebinds)>".format(
+            self.name, self.address or 0, self.rebinds)
+
+
+class DoubleBuffer(object):
+    """Two sets of preallocated arrays for consistent reads while the model
+    runs.
+
+    Get one with :meth:`SubgridWrapper.enable_double_buffer`. Every
+    ``every`` steps the variables are copied into the back buffer, which
+    then becomes the front buffer in one (atomic) assignment. Readers in
+    other threads never wait and never see a half updated front buffer.
+
+    """
+
+    def __init__(self, wrapper, names, every=1, sliced=True):
+        self.wrapper = wrapper
+        self.names = list(names)
+        self.every = every
+        self.sliced = sliced
+        self.buffers = [{}, {}]
+        # number of swaps, and of fills that started
+        self.version = 0
+        self.started = 0
+        self.steps = 0
+        # (version, t1, arrays), replaced as a whole
+        self.front = None
+        self.fill()
+
+    def fill(self):
+        """Copy the variables into the back buffer and swap"""
+        back = self.buffers[self.version % 2]
+        arrays = self.wrapper.get_many(self.names, sliced=self.sliced)
+        self.started += 1
+        for name, array in arrays.items():
+            target = back.get(name)
+            if target is None or target.shape != array.shape:
+                # (re)allocate, only if the variable changed size
+                target = back[name] = np.empty_like(array)
+            np.copyto(target, array)
+        t1 = float(self.wrapper.get_nd('t1'))
+        self.version += 1
+        self.front = (self.version, t1, back)
+
+    def step(self):
+        """Count a timestep, fill the buffer if it's due"""
+        self.steps += 1
+        if self.steps % self.every == 0:
+            self.fill()
+
+    def read(self, copy=False):
+        """Return the version, t1 and arrays of the front buffer.
+
+        Don't change the arrays. They stay valid until the buffer is filled
+        twice more, so if you need them longer pass ``copy=True``. The copy
+        is checked against swaps that happen while copying.
+        """
+        while True:
+            version, t1, arrays = self.front
+            if not copy:
+                return version, t1, arrays
+            copies = {name: array.copy() for name, array in arrays.items()}
+            # no fill started in our arrays (the second after ours)
+            if self.started - version <= 1:
+                return version, t1, copies
+
+
 class SubgridWrapper(object):
     """Wrapper around the ctypes-loaded Fortran subgrid library.
 
@@ -409,14 +1028,30 @@ class SubgridWrapper(object):
 
     def __init__(
         self, mdu=None, sharedmem=False, set_logger=True,
-        set_progress=False, output_dir=None):
+        set_progress=False, output_dir=None, strict=False,
+        instrument=False, buffer_callbacks=False):
         """Initialize the class.
 
         The ``mdu`` argument should be the path to a model's ``*.mdu``
         file.
 
-        The ``sharedmem`` argument indicates wheter memory should be
-        allocated using the multiprocessing shared memory (for forking).
+        The ``sharedmem`` argument indicates wheter variables should be
+        copied into named shared memory segments (see
+        :mod:`python_subgrid.sharedmem`). The segments are allocated once per
+        variable and refreshed after every update. Pass a string to use it as
+        prefix for the segment names, other processes can attach to
+        ``'{prefix}-{variable}'``.
+
+        With ``strict``, the wrapped fortran functions raise a ``TypeError``
+        when they are called with the wrong number of arguments or with
+        arguments of the wrong type, instead of logging a warning.
+
+        With ``instrument``, calls are counted and timed (see
+        :meth:`enable_instrumentation`).
+
+        With ``buffer_callbacks``, fortran log and progress messages are
+        buffered in a :class:`CallbackBuffer` and logged after every update.
+        Pass ``'thread'`` to log them from a background thread instead.
 
         Nothing much should happen here so that the code remains easy to
         test. Most of the library-related initialization happens in the
@@ -428,6 +1063,23 @@ class SubgridWrapper(object):
         self.set_logger = set_logger
         self.set_progress = set_progress
         self.output_dir = output_dir
+        self.strict = strict
+        self.instrument = instrument
+        # call counts and latencies, if enabled
+        self.instrumentation = None
+        self.buffer_callbacks = buffer_callbacks
+        self.callback_buffer = CallbackBuffer() if buffer_callbacks else None
+        # consistent copies of output variables, if enabled
+        self.double_buffer = None
+        self.metadata = MetadataRegistry(self)
+        # views handed out by bind, revalidated after every update
+        self.bound_arrays = weakref.WeakSet()
+        # preallocated buffers for get_many(copy=True)
+        self._arenas = {}
+        # named shared memory segments, by variable name
+        self.shared_arrays = {}
+        # named in-memory snapshots of the model state
+        self.snapshots = SnapshotStore()
 
     def _setlogger(self):
         """subscribe to fortran log messages"""
@@ -437,7 +1089,10 @@ class SubgridWrapper(object):
         self.library.set_logger.argtypes = [
             fortran_log_functype
         ]
-        self.library.set_logger(fortran_log_func)
+        if self.callback_buffer is not None:
+            self.library.set_logger(self.callback_buffer.log_func)
+        else:
+            self.library.set_logger(fortran_log_func)
 
     def _setprogress(self):
         """subscribe to progress updates"""
@@ -445,7 +1100,11 @@ class SubgridWrapper(object):
         # as an argument we need a pointer to a fortran log func...
         self.library.set_progress_c_callback.argtypes = [
             POINTER(fortran_progress_functype)]
-        self.library.set_progress_c_callback(byref(fortran_progress_func))
+        if self.callback_buffer is not None:
+            progress_func = self.callback_buffer.progress_func
+        else:
+            progress_func = fortran_progress_func
+        self.library.set_progress_c_callback(byref(progress_func))
 
     def _libname(self):
         """Return platform-specific subgridf90 shared library name."""
@@ -468,7 +1127,13 @@ class SubgridWrapper(object):
 
         If the library cannot be found, a ``RuntimeError`` with debug
         information is raised.
+
+        The path is cached per process, a cached path only needs to exist.
         """
+        key = (os.environ.get('SUBGRID_PATH', ''), os.getcwd())
+        cached = LIBRARY_PATH_CACHE.get(key)
+        if cached is not None and os.path.exists(cached):
+            return cached
         known_paths = [
             # From very specific to generic. Local installs win,
             # and /opt/3di wins over system installs.
@@ -488,16 +1153,18 @@ class SubgridWrapper(object):
                               for path in known_paths]
         for library in possible_libraries:
             if os.path.exists(library):
+                # the model changes the working directory
+                library = os.path.abspath(library)
                 logger.info("Using subgrid fortran library %s", library)
+                LIBRARY_PATH_CACHE[key] = library
                 return library
         msg = "Library not found, looked in %s" % ', '.join(possible_libraries)
         raise RuntimeError(msg)
 
     def _load_library(self):
-        """Return the fortran library, loaded with """
-        path = self._library_path()
-        logger.info("Loading library from path {}".format(path))
-        return cdll.LoadLibrary(path)
+        """Return the fortran library, loaded and annotated once per process
+        (see :func:`load_library`)"""
+        return load_library(self._library_path())
 
     def _annotate_functions(self):
         """Help ctypes by telling it type information about Fortran functions.
@@ -515,41 +1182,58 @@ class SubgridWrapper(object):
         On the wrapper the functions can be called with python types.
 
         """
-        def wrap(func):
+        def wrap(func, reallocates=False, timestep=False):
             """Return wrapped function with type conversion and sanity checks.
+
+            The argument conversions are prepared once, per function.
             """
+            strict = self.strict
+            marshallers = []
+            for argtype in func.argtypes:
+                if isinstance(argtype._type_, str):
+                    # create a string buffer for strings
+                    marshallers.append(string_marshaller(strict))
+                else:
+                    # for other types, reuse a pointer to a value of the type
+                    marshallers.append(pointer_marshaller(argtype, strict))
+            n_args = len(marshallers)
+            returns_pointer = hasattr(func.restype, 'contents')
+
             @functools.wraps(func, assigned=('restype', 'argtypes'))
             def wrapped(*args):
-                if len(args) != len(func.argtypes):
-                    logger.warn("{} {} not of same length",
-                                args, func.argtypes)
-
-                typed_args = []
-                for (arg, argtype) in zip(args, func.argtypes):
-                    if isinstance(argtype._type_, str):
-                        # create a string buffer for strings
-                        typed_arg = create_string_buffer(arg)
-                    else:
-                        # for other types, use the type to do the conversion
-                        typed_arg = argtype(argtype._type_(arg))
-                    typed_args.append(typed_arg)
-                result = func(*typed_args)
-                if hasattr(result, 'contents'):
+                if len(args) != n_args:
+                    if strict:
+                        raise TypeError(
+                            "{}() takes {} arguments ({} given)".format(
+                                func.__name__, n_args, len(args)))
+                    logger.warning("%s %s not of same length",
+                                   args, func.argtypes)
+                result = func(*[marshal(arg) for (marshal, arg)
+                                in zip(marshallers, args)])
+                if reallocates:
+                    self.metadata.invalidate()
+                if timestep:
+                    self._after_update()
+                if returns_pointer:
                     return result.contents
-                else:
-                    return result
+                return result
             return wrapped
+        # the library itself is annotated when it's loaded (annotate_library)
         for function in FUNCTIONS:
             api_function = getattr(self.library, function['name'])
-            api_function.argtypes = function['argtypes']
-            api_function.restype = function['restype']
             # decorate the function with type conversion, so we can pass in
             # normal python stuff make sure the function properties are copied
             # to the wrapper (normally copy __doc__ etc...)
             # @functools.wraps(api_function,assigned=('restype','argtypes') )
-            f = wrap(api_function)
+            f = wrap(api_function,
+                     reallocates=function.get('reallocates', False),
+                     timestep=function.get('timestep', False))
             assert hasattr(f, 'argtypes')
             setattr(self, function['name'], f)
+        if self.instrumentation is not None:
+            # enabled before start or restarted, time the fortran functions
+            self._instrument(self.instrumentation,
+                             [function['name'] for function in FUNCTIONS])
 
     def _load_model(self):
         os.chdir(os.path.dirname(self.mdu) or '.')
@@ -559,6 +1243,7 @@ class SubgridWrapper(object):
         )
         logger.info(logmsg)
         exit_code = self.library.loadmodel(self.mdu.encode("utf-8"))
+        self.metadata.invalidate()
         if exit_code:
             errormsg = "Loading model {mdu} failed with exit code {code}"
             raise RuntimeError(errormsg.format(mdu=self.mdu, code=exit_code))
@@ -576,11 +1261,16 @@ class SubgridWrapper(object):
         :meth:`_load_model` changes the working directory to that of the model.
 
         """
+        enable_faulthandler()
         self.library = self._load_library()
+        if self.buffer_callbacks == 'thread':
+            self.callback_buffer.start_thread()
         if self.set_logger:
             self._setlogger()
         if self.set_progress:
             self._setprogress()
+        if self.instrument:
+            self.enable_instrumentation()
         self._annotate_functions()
         if self.output_dir:
             self.set_output_directory(self.output_dir)
@@ -599,12 +1289,72 @@ class SubgridWrapper(object):
         if self.mdu:
             logger.info('finalize...')
             self.library.finalizemodel()
+        for shared_array in self.shared_arrays.values():
+            shared_array.close()
+        self.shared_arrays.clear()
         logger.info('library shutdown...')
         self.library.shutdown()  # Fortran cleanup function.
+        if self.callback_buffer is not None:
+            self.callback_buffer.stop_thread()
+            self.callback_buffer.drain()
+        self.metadata.invalidate()
         logger.info('chdir...')
         # del self.library  # This one doesn't work.
         os.chdir(self.original_dir)
 
+    def _after_fork(self):
+        """Forget what belongs to the parent, in a forked child process.
+
+        The shared memory segments are the parent's and the background
+        thread that drains the callback buffer did not survive the fork.
+        """
+        self.shared_arrays = {}
+        self.sharedmem = False
+        if self.callback_buffer is not None:
+            self.callback_buffer.thread = None
+
+    def enable_instrumentation(self, max_samples=1000):
+        """Count and time calls, return the :class:`Instrumentation`.
+
+        The fortran functions and the ``get_nd``, ``set_structure_field`` and
+        ``update_tables`` methods are replaced by timed versions on this
+        instance, so there is no overhead as long as this isn't called.
+        Latency percentiles are computed over the last ``max_samples`` calls.
+        Before :meth:`start`, the fortran functions are timed as soon as they
+        are annotated.
+        """
+        if self.instrumentation is not None:
+            return self.instrumentation
+        instrumentation = Instrumentation(max_samples=max_samples)
+        names = [function['name'] for function in FUNCTIONS
+                 if hasattr(self, function['name'])]
+        names.extend(INSTRUMENTED_METHODS)
+        self._instrument(instrumentation, names)
+        self.instrumentation = instrumentation
+        return instrumentation
+
+    def _instrument(self, instrumentation, names):
+        """Replace the functions and methods in names by timed versions"""
+        for name in names:
+            timed = instrumentation.wrap(name, getattr(self, name))
+            setattr(self, name, timed)
+
+    def disable_instrumentation(self):
+        """Restore the untimed functions, return the instrumentation"""
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return None
+        for function in FUNCTIONS:
+            name = function['name']
+            # not annotated before start
+            if hasattr(self, name):
+                setattr(self, name, getattr(self, name).instrumented)
+        for name in INSTRUMENTED_METHODS:
+            # the methods are found on the class again
+            delattr(self, name)
+        self.instrumentation = None
+        return instrumentation
+
     # Variable Information Functions
     # Note that these call subroutines.
     # In python you expect a function to return something
@@ -670,6 +1420,24 @@ class SubgridWrapper(object):
 
         # look up the type name
         compoundname = self.get_var_type(varname)
+        # the structure is looked up once per compound type
+        COMPOUND = self.metadata.compound(compoundname).struct
+
+        # if we have a rank 1 array, create an array
+        rank = self.get_var_rank(varname)
+        assert rank <= 1, "we can't handle >=2 dimensional compounds yet"
+        if rank == 1:
+            shape = self.get_var_shape(varname)
+            valtype = POINTER(ARRAY(COMPOUND, shape[0]))
+        else:
+            valtype = POINTER(COMPOUND)
+        # return the custom type
+        return valtype
+
+    def make_compound_struct(self, compoundname):
+        """
+        Create a ctypes structure for the fields of a compound type.
+        """
         nfields = self.inq_compound(compoundname)
         # for all the fields look up the type, rank and shape
         fields = []
@@ -686,16 +1454,7 @@ class SubgridWrapper(object):
         class COMPOUND(Structure):
             _fields_ = fields
 
-        # if we have a rank 1 array, create an array
-        rank = self.get_var_rank(varname)
-        assert rank <= 1, "we can't handle >=2 dimensional compounds yet"
-        if rank == 1:
-            shape = self.get_var_shape(varname)
-            valtype = POINTER(ARRAY(COMPOUND, shape[0]))
-        else:
-            valtype = POINTER(COMPOUND)
-        # return the custom type
-        return valtype
+        return COMPOUND
 
     def get_var_rank(self, name):
         """
@@ -708,11 +1467,14 @@ class SubgridWrapper(object):
         self.library.get_var_rank(name, byref(rank))
         return rank.value
 
-    def get_var_shape(self, name):
+    def get_var_shape(self, name, rank=None):
         """
         Return shape of the array.
+
+        Pass the ``rank`` if you already know it, to save a library call.
         """
-        rank = self.get_var_rank(name)
+        if rank is None:
+            rank = self.get_var_rank(name)
         name = create_string_buffer(name)
         arraytype = ndpointer(dtype='int32',
                               ndim=1,
@@ -723,6 +1485,151 @@ class SubgridWrapper(object):
         self.library.get_var_shape(name, shape)
         return tuple(shape[:rank])
 
+    def _get_address(self, info):
+        """Return the current address of the variable described by info"""
+        address = c_void_p()
+        self.library.get_var(info.c_name, byref(address))
+        return address.value
+
+    def _after_update(self, timestep=True):
+        """Bookkeeping after the model advanced (a timestep, unless the
+        caller counts the steps itself)"""
+        buffer = self.callback_buffer
+        if buffer is not None and buffer.thread is None:
+            buffer.drain()
+        for bound_array in self.bound_arrays:
+            bound_array.validate()
+        for name in list(self.shared_arrays):
+            # refreshes the segment in place
+            self._get_nd(self.metadata[name])
+        if timestep and self.double_buffer is not None:
+            self.double_buffer.step()
+
+    def enable_double_buffer(self, names, every=1, sliced=True):
+        """Copy variables names into a :class:`DoubleBuffer` every ``every``
+        steps, return the buffer.
+
+        Other threads can read consistent copies with :meth:`read_buffer`
+        while the model runs.
+        """
+        self.double_buffer = DoubleBuffer(self, names, every=every,
+                                          sliced=sliced)
+        return self.double_buffer
+
+    def disable_double_buffer(self):
+        self.double_buffer = None
+
+    def read_buffer(self, copy=False):
+        """Return the version, t1 and the variables of the front buffer.
+
+        See :meth:`DoubleBuffer.read`.
+        """
+        if self.double_buffer is None:
+            raise ValueError("Double buffering is not enabled")
+        return self.double_buffer.read(copy=copy)
+
+    def bind(self, name, sliced=False):
+        """Return a :class:`BoundArray`, a long lived view on variable name.
+
+        The bound array follows the Fortran variable if it is reallocated, so
+        you can keep using it in a loop::
+
+            s1 = subgrid.bind('s1', sliced=True)
+            for i in range(10):
+                subgrid.update(-1)
+                print(s1.array.max())
+
+        """
+        if name not in DOCUMENTED_VARIABLES:
+            msg = "Requesting variable '{}', but it isn't documented.".format(
+                name)
+            raise NotDocumentedError(msg)
+        bound_array = BoundArray(self, name, sliced=sliced)
+        self.bound_arrays.add(bound_array)
+        return bound_array
+
+    def run_until(self, t_end=None, callback=None, every=None, interval=None):
+        """Advance the model until t1 reaches t_end (default: tend).
+
+        The Fortran ``update`` is called directly in a tight loop. Bound
+        arrays and shared memory segments are only brought up to date when
+        the callback is called and at the end of the run. The callback is
+        called as ``callback(subgrid)``, after every ``every`` steps and/or
+        every ``interval`` seconds of model time. If neither is given, it is
+        called after every step.
+
+        Returns a dictionary with the number of steps and callbacks, the
+        model time and the (wall clock) time spent in the steps::
+
+            stats = subgrid.run_until(3600, callback=send, interval=300)
+            logger.info("%(steps)d steps, %(mean).4fs per step", stats)
+
+        """
+        if t_end is None:
+            t_end = float(self.get_nd('tend'))
+        if callback is not None and every is None and interval is None:
+            every = 1
+        # t1 is a scalar module variable, it doesn't move
+        t1 = POINTER(c_double)()
+        self.library.get_var(self.metadata['t1'].c_name, byref(t1))
+        update = self.library.update
+        # use the default timestep
+        dt = byref(c_double(-1))
+        timer = timeit.default_timer
+        next_time = t1[0] + interval if interval else None
+        double_buffer = self.double_buffer
+        # the fortran update is called directly, record it here
+        stats = None
+        if self.instrumentation is not None:
+            stats = self.instrumentation['update']
+        steps = 0
+        callbacks = 0
+        total = 0.0
+        shortest = float('inf')
+        longest = 0.0
+        start = timer()
+        while t1[0] < t_end:
+            before = timer()
+            exit_code = update(dt)
+            duration = timer() - before
+            total += duration
+            if duration < shortest:
+                shortest = duration
+            if duration > longest:
+                longest = duration
+            if stats is not None:
+                stats.record(duration)
+            if exit_code:
+                self._after_update(timestep=False)
+                raise RuntimeError(
+                    "Update failed with exit code {} at t1={}".format(
+                        exit_code, t1[0]))
+            steps += 1
+            if double_buffer is not None:
+                double_buffer.step()
+            if callback is None:
+                continue
+            due = bool(every) and steps % every == 0
+            if next_time is not None and t1[0] >= next_time:
+                due = True
+                while next_time <= t1[0]:
+                    next_time += interval
+            if due:
+                self._after_update(timestep=False)
+                callback(self)
+                callbacks += 1
+        self._after_update(timestep=False)
+        return {
+            'steps': steps,
+            'callbacks': callbacks,
+            't1': t1[0],
+            'elapsed': timer() - start,
+            'total': total,
+            'mean': total / steps if steps else 0.0,
+            'min': shortest if steps else 0.0,
+            'max': longest,
+        }
+
     # Change sliced to True, once we have a complete list of slices...
     def get_nd(self, name, sliced=False):
         """Return an nd array from subgrid library"""
@@ -734,36 +1641,23 @@ class SubgridWrapper(object):
             msg = "Requesting variable '{}', but it isn't documented.".format(
                 name)
             raise NotDocumentedError(msg)
-        # How many dimensions.
-        rank = self.get_var_rank(name)
-        # The shape array is fixed size
-        shape = np.empty((MAXDIMS, ), dtype='int32', order='fortran')
-        shape = self.get_var_shape(name)
-        # there should be nothing here...
-        assert sum(shape[rank:]) == 0
-        # variable type name
-        type_ = self.get_var_type(name)
+        # Rank, shape, type and pointer type, looked up once per variable
+        info = self.metadata[name]
+        return self._get_nd(info, sliced=sliced)
+
+    def _get_nd(self, info, sliced=False):
+        """Return an nd array for the variable described by info"""
+        name = info.name
+        type_ = info.type_
 
         is_numpytype = type_ in TYPEMAP
 
-        if is_numpytype:
-            # Store the data in this type
-            arraytype = ndpointer(dtype=TYPEMAP[type_],
-                                  ndim=rank,
-                                  shape=shape,
-                                  flags='F')
-        else:
-            arraytype = self.make_compound_ctype(name)
         # Create a pointer to the array type
-        data = arraytype()
+        data = info.arraytype()
         # The functions get_var_type/_shape/_rank are already wrapped with
         # python function converter, get_var isn't.
-        c_name = create_string_buffer(name)
-        get_var = self.library.get_var
-        get_var.argtypes = [c_char_p, POINTER(arraytype)]
-        get_var.restype = None
         # Get the array
-        get_var(c_name, byref(data))
+        self.library.get_var(info.c_name, byref(data))
         if not data:
             logger.info("NULL pointer returned")
             return None
@@ -771,12 +1665,7 @@ class SubgridWrapper(object):
         if is_numpytype:
             # array can be shared memory (always a copy)
             if self.sharedmem:
-                shared_arr = multiprocessing.Array(
-                    CTYPESMAP[TYPEMAP[type_]],
-                    np.prod(shape), lock=True
-                )
-                array = np.frombuffer(shared_arr.get_obj())
-                array[:] = np.array(data)
+                array = self._shared_array(info, data)
             # or a copy, if needed
             else:
                 if name in NEED_COPYING:
@@ -787,56 +1676,248 @@ class SubgridWrapper(object):
                 else:
                     array = np.ctypeslib.as_array(data)
         else:
-            array = structs2pandas(data.contents)
+            array = records2pandas(self._records(info, data))
 
-        if name in SLICES and sliced:
+        if sliced:
             # return slice if needed
-            array = array[SLICES[name]]
+            index = self._index(info)
+            if index is not None:
+                array = array[index]
         return array
 
+    def _index(self, info):
+        """Return the index of the sliced variable, None to not slice.
+
+        The sections of the catalogue are resolved once per variable (and
+        again after the library reallocates).
+        """
+        if info.name in SLICES:
+            return SLICES[info.name]
+        key = ('index', info.name)
+        derived = self.metadata.derived
+        try:
+            return derived[key]
+        except KeyError:
+            pass
+        spec = CATALOGUE.get(info.name)
+        index = None
+        if spec is not None and spec.section is not None:
+            if info.type_ in TYPEMAP:
+                index = section2index(spec.section, info.shape,
+                                      self._symbols(spec.section))
+            if index is None:
+                logger.debug("Section %s does not fit %s with shape %s",
+                             spec.section, info.name, info.shape)
+        derived[key] = index
+        return index
+
+    def _symbols(self, section):
+        """Return the values of the symbols in section, as far as known"""
+        symbols = self.metadata.derived.setdefault('symbols', {})
+        bounds = []
+        for dimension in section:
+            bounds.extend(dimension if isinstance(dimension, tuple)
+                          else [dimension])
+        for symbol in bounds:
+            if not isinstance(symbol, str) or symbol in symbols:
+                continue
+            if symbol in EXTENT_SYMBOLS:
+                name, axis = EXTENT_SYMBOLS[symbol]
+                info = self.metadata[name]
+                # None if the array isn't allocated
+                symbols[symbol] = (int(info.shape[axis]) or None
+                                   if info.rank > axis else None)
+                continue
+            names = SYMBOLS.get(symbol, [])
+            values = [self._fortran_array(name) for name in names]
+            if not names or any(value is None for value in values):
+                # unknown, the array is assumed to start at 0
+                symbols[symbol] = None
+            else:
+                symbols[symbol] = sum(int(value) for value in values)
+        return symbols
+
+    def get_records(self, name):
+        """Return a record array view on a compound variable.
+
+        The records live in Fortran memory, nothing is copied. Use
+        :func:`records2pandas` if you need a data frame (that's what
+        :meth:`get_nd` returns for compound variables).
+        """
+        if name not in DOCUMENTED_VARIABLES:
+            msg = "Requesting variable '{}', but it isn't documented.".format(
+                name)
+            raise NotDocumentedError(msg)
+        info = self.metadata[name]
+        if info.type_ in TYPEMAP:
+            raise ValueError("{} is not a compound variable".format(name))
+        data = info.arraytype()
+        self.library.get_var(info.c_name, byref(data))
+        if not data:
+            logger.info("NULL pointer returned")
+            return None
+        return self._records(info, data)
+
+    def _records(self, info, data):
+        """Return record array view on the compound data pointer"""
+        dtype = self.metadata.compound(info.type_).dtype
+        records = np.frombuffer(data.contents, dtype=dtype)
+        return records.view(np.recarray)
+
+    def shared_name(self, name):
+        """Return the name of the shared memory segment of variable name"""
+        if isinstance(self.sharedmem, str):
+            prefix = self.sharedmem
+        else:
+            prefix = 'subgrid-{}'.format(os.getpid())
+        return '{}-{}'.format(prefix, name)
+
+    def _shared_array(self, info, data):
+        """Copy data in the shared segment of the variable and return it"""
+        dtype = np.dtype(TYPEMAP[info.type_])
+        shared_array = self.shared_arrays.get(info.name)
+        if (shared_array is None or
+                shared_array.shape != tuple(info.shape) or
+                shared_array.dtype != dtype):
+            if shared_array is not None:
+                shared_array.close()
+            shared_array = SharedArray(self.shared_name(info.name),
+                                       info.shape, dtype)
+            self.shared_arrays[info.name] = shared_array
+        shared_array.refresh(np.ctypeslib.as_array(data))
+        return shared_array.array
+
+    def get_many(self, names, sliced=False, copy=False):
+        """Return a dictionary with an nd array for every variable in names.
+
+        This saves the per variable overhead of :meth:`get_nd` when you
+        need a lot of variables at once, for example to publish the grid.
+        Metadata for all variables is resolved before anything is fetched.
+        Like :meth:`get_nd`, the arrays are only sliced with ``sliced=True``.
+
+        With ``copy=True`` the arrays are copied into one preallocated
+        contiguous buffer. The buffer is reused by the next call with the same
+        names, so copy the result if you want to keep it.
+        """
+        names = list(names)
+        undocumented = [name for name in names
+                        if name not in DOCUMENTED_VARIABLES]
+        if undocumented:
+            msg = ("Requesting variables {}, but they aren't "
+                   "documented.".format(undocumented))
+            raise NotDocumentedError(msg)
+        infos = [self.metadata[name] for name in names]
+        arrays = [(info.name, self._get_nd(info, sliced=sliced))
+                  for info in infos]
+        if copy:
+            return self._copy_to_arena((tuple(names), sliced), arrays)
+        return dict(arrays)
+
+    def _copy_to_arena(self, key, arrays):
+        """Copy numpy arrays into one buffer, that is reused per key"""
+        layout = [(name, array.shape, array.dtype)
+                  for name, array in arrays
+                  if isinstance(array, np.ndarray)]
+        layout_views = self._arenas.get(key)
+        if layout_views is None or layout_views[0] != layout:
+            if len(self._arenas) >= MAX_ARENAS:
+                self._arenas.clear()
+            offsets = []
+            size = 0
+            for name, shape, dtype in layout:
+                offsets.append(size)
+                nbytes = int(np.prod(shape)) * dtype.itemsize
+                # keep every array at an aligned offset
+                size += -(-nbytes // ARENA_ALIGNMENT) * ARENA_ALIGNMENT
+            arena = np.empty(max(size, 1), dtype='uint8')
+            views = {
+                name: np.ndarray(shape, dtype=dtype, buffer=arena,
+                                 offset=offset, order='F')
+                for (name, shape, dtype), offset in zip(layout, offsets)
+            }
+            logger.debug("Allocated %d bytes for copies of %d variables",
+                         size, len(views))
+            layout_views = self._arenas[key] = (layout, views)
+        views = layout_views[1]
+        result = {}
+        for name, array in arrays:
+            if name in views:
+                np.copyto(views[name], array)
+                result[name] = views[name]
+            else:
+                # NULL pointers and compound variables (data frames)
+                result[name] = array
+        return result
+
     def set_structure_field(self, name, id, field, value):
+        """Set field of the structure with id in compound variable name"""
+        info = self.metadata[name]
         # This only works for 1d
-        rank = self.get_var_rank(name)
-        assert rank == 1
-        # The shape array is fixed size
-        shape = np.empty((MAXDIMS, ), dtype='int32', order='fortran')
-        shape = self.get_var_shape(name)
-        # there should be nothing here...
-        assert sum(shape[rank:]) == 0
-
-        # look up the type name
-        typename = self.get_var_type(name)
-        assert typename not in TYPEMAP
-        nfields = self.inq_compound(typename)
-        # for all the fields look up the type, rank and shape
-        fields = {}
-        for i in range(nfields):
-            (fieldname, fieldtype,
-             fieldrank, fieldshape) = self.inq_compound_field(typename, i)
-            assert fieldrank <= 1
-            fieldctype = CTYPESMAP[fieldtype]
-            if fieldrank == 1:
-                fieldctype = fieldctype*fieldshape[0]
-            fields[fieldname] = fieldctype
+        assert info.rank == 1
+        assert info.type_ not in TYPEMAP
 
-        T = fields[field]       # type (c_double)
+        # the fields are looked up once per compound type
+        T = self.metadata.compound(info.type_).fields[field]  # (c_double)
         T_p = POINTER(T)        # void pointer, as used in the model
 
-        set_structure_field = self.library.set_structure_field
-        set_structure_field.argtypes = [
-            c_char_p, c_char_p, c_char_p, POINTER(T_p)]
-        set_structure_field.restype = None
         # So the value is a void pointer by reference....
         # Create a value wrapped in a c_double_p
 
         # wrap it up in the first pointer
         c_value = T_p(T(value))
 
-        c_name = create_string_buffer(name)
         c_id = create_string_buffer(id)
         c_field = create_string_buffer(field)
         # Pass the void_p by reference...
-        set_structure_field(c_name, c_id, c_field, byref(c_value))
+        self.library.set_structure_field(
+            info.c_name, c_id, c_field, byref(c_value))
+
+    def _structure_index(self, name):
+        """Return mapping from structure id to index in variable name"""
+        key = ('structure_index', name)
+        index = self.metadata.derived.get(key)
+        if index is None:
+            records = self.get_records(name)
+            index = {id_.rstrip(): i for i, id_ in enumerate(records['id'])}
+            self.metadata.derived[key] = index
+        return index
+
+    def set_structure_fields(self, name, ids, field, values, direct=False):
+        """Set field of all structures with ids in compound variable name.
+
+        The values can be a sequence with a value for every id, or one
+        value for all of them. This is for control loops that update a lot
+        of structures every timestep.
+
+        By default :meth:`set_structure_field` is called for every
+        structure. With ``direct=True`` numeric fields are written in one go
+        in the record array view (see :meth:`get_records`), which is a lot
+        faster. Only use it for fields that the library does nothing with but
+        store the value.
+        """
+        info = self.metadata[name]
+        assert info.type_ not in TYPEMAP
+        fieldctype = self.metadata.compound(info.type_).fields[field]
+        safe = field != 'id' and fieldctype in DIRECT_CTYPES
+        if direct and not safe:
+            raise ValueError(
+                "Field {} can't be written directly".format(field))
+        ids = list(ids)
+        values = np.broadcast_to(values, (len(ids), ))
+        if not direct:
+            for id, value in zip(ids, values):
+                self.set_structure_field(name, id, field, value)
+            return
+        index = self._structure_index(name)
+        encoding = sys.getdefaultencoding()
+        try:
+            indices = [
+                index[id if isinstance(id, bytes) else id.encode(encoding)]
+                for id in ids
+            ]
+        except KeyError as e:
+            raise KeyError("No structure {} in {}".format(e, name))
+        self.get_records(name)[field][indices] = values
 
     def update_tables(self, name, nodelist):
         """update the tables corresponding
@@ -852,7 +1933,148 @@ class SubgridWrapper(object):
         argtypes = [c_char_p, arraytype, POINTER(c_int)]
         self.library.update_tables.argtypes = argtypes
         self.library.update_tables.restype = c_int
-        return self.library.update_tables(name, nodelist, byref(n))
+        result = self.library.update_tables(name, nodelist, byref(n))
+        self.metadata.invalidate()
+        return result
+
+    def _quad_lookup(self):
+        """Return the pixel grid and the sorted keys of the 2d quad cells.
+
+        A quad cell of refinement k covers imaxk[k] x jmaxk[k] pixels, the
+        key of a cell is its refinement and position (k, n, m) as one
+        number. The lookup is cached until the grid changes.
+        """
+        lookup = self.metadata.derived.get('quad_lookup')
+        if lookup is not None:
+            return lookup
+        grid = self.get_many(['x0p', 'y0p', 'dxp', 'imax', 'jmax',
+                              'imaxk', 'jmaxk', 'nodm', 'nodn', 'nodk',
+                              'nod_type'], sliced=False)
+        imax, jmax = int(grid['imax']), int(grid['jmax'])
+        # node numbers (0 based, without the dummy node) of the 2d cells
+        nodes = np.nonzero(grid['nod_type'][1:] == 1)[0]
+        k = grid['nodk'][nodes].astype('int64') - 1
+        n = grid['nodn'][nodes].astype('int64') - 1
+        m = grid['nodm'][nodes].astype('int64') - 1
+        keys = (k * jmax + n) * imax + m
+        order = np.argsort(keys)
+        lookup = {
+            'origin': (float(grid['x0p']), float(grid['y0p'])),
+            'dxp': float(grid['dxp']),
+            'shape': (jmax, imax),
+            'cellsizes': list(zip(grid['imaxk'].copy(), grid['jmaxk'].copy())),
+            'keys': keys[order],
+            'nodes': nodes[order]
+        }
+        self.metadata.derived['quad_lookup'] = lookup
+        return lookup
+
+    def locate(self, xs, ys):
+        """Return the node numbers of the 2d cells at points xs, ys.
+
+        The node numbers index the sliced node variables, like
+        ``get_nd('s1', sliced=True)``. Points outside the 2d grid get -1.
+        The result only depends on the grid, so it can be passed to
+        :meth:`get_waterlevels` for every timestep.
+        """
+        lookup = self._quad_lookup()
+        x0, y0 = lookup['origin']
+        jmax, imax = lookup['shape']
+        keys = lookup['keys']
+        cols = np.floor((np.asarray(xs, dtype='double') - x0) /
+                        lookup['dxp']).astype('int64')
+        rows = np.floor((np.asarray(ys, dtype='double') - y0) /
+                        lookup['dxp']).astype('int64')
+        inside = (cols >= 0) & (cols < imax) & (rows >= 0) & (rows < jmax)
+        index = np.full(cols.shape, -1, dtype='int64')
+        if not len(keys):
+            return index
+        # try every refinement level, a pixel is in one cell only
+        for k, (imaxk, jmaxk) in enumerate(lookup['cellsizes']):
+            point_keys = (k * jmax + rows // jmaxk) * imax + cols // imaxk
+            positions = np.searchsorted(keys, point_keys).clip(
+                0, len(keys) - 1)
+            found = inside & (keys[positions] == point_keys)
+            index[found] = lookup['nodes'][positions[found]]
+        return index
+
+    def get_waterlevels(self, xs, ys, index=None):
+        """Return the water levels (s1) at points xs, ys.
+
+        This is the vectorized version of :meth:`getwaterlevel`, the water
+        level of the 2d cell that contains a point. Points outside the 2d
+        grid get NaN. Pass the ``index`` returned by :meth:`locate` to skip
+        the lookup when you sample the same points every timestep.
+        """
+        if index is None:
+            index = self.locate(xs, ys)
+        s1 = self.get_nd('s1', sliced=True)
+        waterlevels = s1[index]
+        waterlevels[index < 0] = np.nan
+        return waterlevels
+
+    def _fortran_array(self, name):
+        """Return a view on the Fortran memory of variable name, also in
+        shared memory mode. Return None if it isn't allocated."""
+        info = self.metadata[name]
+        data = info.arraytype()
+        self.library.get_var(info.c_name, byref(data))
+        if not data:
+            return None
+        return np.ctypeslib.as_array(data)
+
+    def snapshot(self, name=None, compress=False, variables=None):
+        """Return a copy of the model state.
+
+        The state consists of the variables flagged as state in
+        ``extractedvariables.json`` and the model time (``t0``, ``t1``,
+        ``dt`` and ``nt``). Pass ``variables`` to capture other variables.
+        With ``compress`` the copies are compressed with zlib, which takes
+        some time but saves a lot of memory for dry models.
+
+        With a name the snapshot is also kept in :attr:`snapshots`, where the
+        least recently used are dropped if they don't fit in
+        ``snapshots.max_bytes``.
+
+        Variables that are not allocated in this model (``sg`` without
+        groundwater, for example) are skipped.
+        """
+        if variables is None:
+            variables = STATE_VARIABLES + TIME_VARIABLES
+        arrays = []
+        for variable in variables:
+            array = self._fortran_array(variable)
+            if array is None:
+                logger.debug("Not in snapshot: %s is not allocated", variable)
+                continue
+            arrays.append((variable, array))
+        snapshot = Snapshot(arrays, compress=compress)
+        if name is not None:
+            self.snapshots[name] = snapshot
+        return snapshot
+
+    def restore(self, snapshot):
+        """Copy a snapshot (or the name of one) back into the model"""
+        if not isinstance(snapshot, Snapshot):
+            snapshot = self.snapshots[snapshot]
+        # check everything first, we don't want to restore half a state
+        arrays = []
+        for variable in snapshot:
+            array = self._fortran_array(variable)
+            dtype, shape, data = snapshot.variables[variable]
+            if array is None:
+                raise ValueError(
+                    "Can't restore {}, it is not allocated".format(variable))
+            if array.shape != shape or array.dtype != dtype:
+                raise ValueError(
+                    "Can't restore {}, it changed from {} {} to {} {}".format(
+                        variable, dtype, shape, array.dtype, array.shape))
+            arrays.append((variable, array))
+        for variable, array in arrays:
+            array[...] = snapshot[variable]
+        self._after_update(timestep=False)
+        if self.double_buffer is not None:
+            self.double_buffer.fill()
 
     def __enter__(self):
         """Return the decorated instance upon entering the ``with`` block.
@@ -26,6 +26,7 @@ install_requires = [
 
 if sys.version_info[0] < 3:
     install_requires.append('faulthandler')
+    install_requires.append('futures')
 
 
 tests_require = [